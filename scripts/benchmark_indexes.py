@@ -0,0 +1,208 @@
+"""Benchmarks the hot booking, invoice and user queries without and with indexes.
+
+Seeds a scratch database with synthetic customers, walkers, services, bookings and
+invoices, times the crud queries with every index dropped, then creates the
+indexes declared on the models (the ones added by the Alembic migrations) and
+times them again.
+
+Usage (from the repository root):
+
+    python scripts/benchmark_indexes.py [--database-uri sqlite:///benchmark.db]
+        [--bookings 200000] [--repeat 20]
+
+The database at --database-uri is dropped and recreated, so never point it at a
+real database. Defaults to a temporary SQLite file.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi import Response
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from cruds import booking_crud, invoice_crud, user_crud
+import models
+from models import Booking, Customer, Invoice, Service, User
+from pagination import invalidate_count_cache
+from schemas.pagination_schema import PaginationParamsSchema
+
+NUMBER_OF_USERS = 20
+NUMBER_OF_CUSTOMERS = 500
+NUMBER_OF_SERVICES = 10
+NUMBER_OF_DAYS = 5 * 365
+
+
+def seed(engine, number_of_bookings: int):
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    audit = {"created_by": 1, "updated_by": 1, "created_at": now, "updated_at": now}
+    first_day = date.today() - timedelta(days=NUMBER_OF_DAYS // 2)
+    random.seed(0)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {"user_id": i, "name": f"Walker {i}", "is_active": True, **audit}
+                for i in range(1, NUMBER_OF_USERS + 1)
+            ],
+        )
+        connection.execute(
+            insert(Customer),
+            [
+                {"customer_id": i, "name": f"Customer {i}", "is_active": True, **audit}
+                for i in range(1, NUMBER_OF_CUSTOMERS + 1)
+            ],
+        )
+        connection.execute(
+            insert(Service),
+            [
+                {
+                    "service_id": i,
+                    "name": f"Service {i}",
+                    "price": 10.0 + i,
+                    "duration": 30.0,
+                    **audit,
+                }
+                for i in range(1, NUMBER_OF_SERVICES + 1)
+            ],
+        )
+        connection.execute(
+            insert(Invoice),
+            [
+                {
+                    "invoice_id": i,
+                    "customer_id": random.randint(1, NUMBER_OF_CUSTOMERS),
+                    "date_start": first_day + timedelta(days=i % NUMBER_OF_DAYS),
+                    "date_end": first_day + timedelta(days=i % NUMBER_OF_DAYS + 30),
+                    "date_issued": first_day + timedelta(days=i % NUMBER_OF_DAYS),
+                    "price_subtotal": 100.0,
+                    "price_discount": 0.0,
+                    "price_total": 100.0,
+                    "reference": f"W4LKIES-{i:08X}",
+                    **audit,
+                }
+                for i in range(1, number_of_bookings // 20 + 1)
+            ],
+        )
+        batch_size = 10000
+        for start in range(0, number_of_bookings, batch_size):
+            connection.execute(
+                insert(Booking),
+                [
+                    {
+                        "date": first_day
+                        + timedelta(days=random.randrange(NUMBER_OF_DAYS)),
+                        "time": time_of_day(random.randint(8, 17), 15 * (i % 4)),
+                        "customer_id": random.randint(1, NUMBER_OF_CUSTOMERS),
+                        "service_id": random.randint(1, NUMBER_OF_SERVICES),
+                        "user_id": random.randint(1, NUMBER_OF_USERS),
+                        **audit,
+                    }
+                    for i in range(start, min(start + batch_size, number_of_bookings))
+                ],
+            )
+
+
+def drop_indexes(engine):
+    with engine.begin() as connection:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(connection, checkfirst=True)
+
+
+def create_indexes(engine):
+    with engine.begin() as connection:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        connection.execute(text("ANALYZE"))
+
+
+def get_benchmarks() -> dict:
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    pagination_params = PaginationParamsSchema(page=1, page_size=20)
+
+    def bookings_by_user(db):
+        booking_crud.get_upcoming_bookings(db, pagination_params, Response(), user_id=3)
+
+    def bookings_by_customer(db):
+        booking_crud.get_bookings(
+            db, customer_id=42, date_min=month_ago, date_max=today
+        )
+
+    def bookings_history(db):
+        booking_crud.get_historic_bookings(db, pagination_params, Response())
+
+    def invoices_by_date(db):
+        invoice_crud.get_invoices(db, date_min=month_ago)
+
+    def user_by_name(db):
+        user_crud.get_user_by_name(db, f"Walker {NUMBER_OF_USERS}")
+
+    return {
+        "upcoming bookings by walker": bookings_by_user,
+        "month of bookings by customer": bookings_by_customer,
+        "booking history page": bookings_history,
+        "invoices issued in a month": invoices_by_date,
+        "user by name": user_by_name,
+    }
+
+
+def run_benchmarks(engine, repeat: int) -> dict:
+    results = {}
+    for name, benchmark in get_benchmarks().items():
+        timings = []
+        for _ in range(repeat):
+            # Count totals would otherwise be served from the cache
+            invalidate_count_cache(Booking.__tablename__, Invoice.__tablename__)
+            with Session(engine) as db:
+                start = time.perf_counter()
+                benchmark(db)
+                timings.append(time.perf_counter() - start)
+        results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-uri", help="Scratch database to seed")
+    parser.add_argument("--bookings", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    database_uri = args.database_uri
+    if database_uri is None:
+        database_file = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        database_uri = f"sqlite:///{database_file}"
+    engine = create_engine(database_uri)
+
+    print(f"Seeding {args.bookings} bookings into {engine.url!r} ...")
+    seed(engine, args.bookings)
+
+    drop_indexes(engine)
+    before = run_benchmarks(engine, args.repeat)
+    create_indexes(engine)
+    after = run_benchmarks(engine, args.repeat)
+
+    print(f"{'query':<32} {'before [ms]':>12} {'after [ms]':>12} {'speedup':>8}")
+    for name in before:
+        print(
+            f"{name:<32} {before[name] * 1000:>12.2f} {after[name] * 1000:>12.2f} "
+            f"{before[name] / after[name]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Reports where the time goes when the app is imported (i.e. on a cold start).
+
+Runs `python -X importtime` on the module Vercel loads and prints the total import
+time along with the slowest top-level packages by the time spent importing them.
+
+Usage (from the repository root, with the .env sourced as in scripts/run.sh):
+
+    python scripts/import_time.py [--module main] [--top 20] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def run_importtime(module: str) -> tuple[float, dict[str, int]]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in ("src", env.get("PYTHONPATH")) if path
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Unable to import {module}")
+
+    # Lines look like "import time:       self [us] |  cumulative | imported package".
+    # Sum the self time of every module into its top-level package, so nested
+    # imports are attributed to the package that actually costs the time.
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(self_time)
+    return wall_time, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Packages to list")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs")
+    args = parser.parse_args()
+
+    wall_times = []
+    runs = []
+    for _ in range(args.repeat):
+        wall_time, packages = run_importtime(args.module)
+        wall_times.append(wall_time)
+        runs.append(packages)
+
+    # Report the median of each package across runs to smooth out noise
+    names = {name for packages in runs for name in packages}
+    medians = {
+        name: statistics.median(packages.get(name, 0) for packages in runs)
+        for name in names
+    }
+    total = sum(medians.values())
+
+    print(f"Interpreter + import of {args.module!r} over {args.repeat} runs:")
+    print(f"  wall time median {statistics.median(wall_times) * 1000:.1f} ms")
+    print(f"  import time median {total / 1000:.1f} ms")
+    print()
+    print(f"{'package':<30} {'time [ms]':>10} {'share':>7}")
+    slowest = sorted(medians.items(), key=lambda item: -item[1])[: args.top]
+    for name, self_time in slowest:
+        print(f"{name:<30} {self_time / 1000:>10.1f} {self_time / total:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
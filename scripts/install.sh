@@ -44,5 +44,6 @@ if [[ $environment == "dev" ]]; then
     pip3 install -r requirements.txt;
 fi
 
-# Database migrations
-bash scripts/migrate.sh "migration"
+# Database migrations (a database created by Flask-Migrate needs a one-off
+# `bash scripts/migrate.sh -s` first, see src/alembic/versions/0a6c2e91b4d3)
+bash scripts/migrate.sh
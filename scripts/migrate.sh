@@ -1,18 +1,51 @@
 #!/usr/bin/env bash
 
+help() {
+   echo "Syntax: bash migrate.sh [-s|h] [message]"
+   echo "options:"
+   echo "s     Stamp an existing database (created by Flask-Migrate) with the"
+   echo "      initial schema revision before upgrading."
+   echo "h     Print this help."
+   echo "message  Autogenerate a new revision from the models with this message."
+   echo
+}
+
+# Revision that creates the tables as they were before Alembic
+initial_revision="0a6c2e91b4d3"
+stamp=false
+
+# Get flags
+while getopts ":sh" option; do
+    case $option in
+        s) # stamp an existing database
+            stamp=true;;
+        h) # display help
+            help;
+            exit;;
+        \?) # Invalid option
+            echo "Error: Invalid option"
+            exit 1;;
+   esac
+done
+shift $((OPTIND - 1))
+
 # Activate the virtual environment if present
 if [ -d venv ]; then
   source venv/bin/activate;
 fi
 
-# 
-if [ ! -d migrations ]; then
-  pwd
-  ls
-  python3 -m flask --app api/wsgi.py db init
+# The tables of a database created by Flask-Migrate already exist, and its
+# alembic_version holds a revision that isn't in src/alembic/versions, which
+# makes every other Alembic command fail. --purge replaces that row.
+if [ "${stamp}" = true ]; then
+  python3 -m alembic -c src/alembic.ini stamp --purge "${initial_revision}" || exit 1
 fi
 
-#
+# Autogenerate a new revision from the models if a message is given
 message=${1}
-python3 -m flask --app api/wsgi.py db migrate -m \""${message}"\"
-python3 -m flask --app api/wsgi.py db upgrade
+if [ -n "${message}" ]; then
+  python3 -m alembic -c src/alembic.ini revision --autogenerate -m "${message}" || exit 1
+fi
+
+# Apply all revisions
+python3 -m alembic -c src/alembic.ini upgrade head
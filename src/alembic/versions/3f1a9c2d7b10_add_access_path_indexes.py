@@ -0,0 +1,57 @@
+"""Add indexes for the booking, invoice and user access paths
+
+Revision ID: 3f1a9c2d7b10
+Revises: 0a6c2e91b4d3
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2d7b10"
+down_revision: Union[str, Sequence[str], None] = "0a6c2e91b4d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+indexes = [
+    # booking_crud.get_bookings filters a date range per walker, customer or
+    # service and orders by date and time
+    ("ix_booking_user_id_date", "booking", ["user_id", "date", "time"]),
+    ("ix_booking_customer_id_date", "booking", ["customer_id", "date"]),
+    ("ix_booking_service_id_date", "booking", ["service_id", "date"]),
+    ("ix_booking_date_time", "booking", ["date", "time"]),
+    # Loading Invoice.bookings
+    ("ix_booking_invoice_id", "booking", ["invoice_id"]),
+    # invoice_crud.get_invoices filters and orders by date issued
+    ("ix_invoice_date_issued", "invoice", ["date_issued"]),
+    # user_crud.get_user_by_name runs on every authenticated request
+    ("ix_user_name", "user", ["name"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build the indexes without locking the tables against writes on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(indexes):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,34 @@
+"""Add user calendar token version
+
+Revision ID: 7b3d5f1e8c24
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7b3d5f1e8c24"
+down_revision: Union[str, Sequence[str], None] = "3f1a9c2d7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped to revoke a user's calendar feed URL
+    op.add_column(
+        "user",
+        sa.Column(
+            "calendar_token_version", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("user", "calendar_token_version")
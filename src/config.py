@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from loguru import logger
 from pydantic_settings import BaseSettings
@@ -6,6 +7,24 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     SQLALCHEMY_DATABASE_URI: str = os.getenv("SQLALCHEMY_DATABASE_URI", "")
+    # Optional read replica that serves the read-only (GET) requests
+    SQLALCHEMY_REPLICA_URI: str = os.getenv("SQLALCHEMY_REPLICA_URI", "")
+    # "queue" keeps a connection pool per process, "serverless" opens a connection
+    # per session (NullPool) for short-lived function instances.
+    DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "queue")
+    # Connections per process to each database (primary and replica), shared by
+    # the sync and async pools: the async pool takes DB_ASYNC_POOL_SIZE and
+    # DB_ASYNC_MAX_OVERFLOW and the sync pool the rest. The async pool is only
+    # created once an async route is used.
+    DB_POOL_SIZE: int = os.getenv("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = os.getenv("DB_MAX_OVERFLOW", 10)
+    DB_ASYNC_POOL_SIZE: int = os.getenv("DB_ASYNC_POOL_SIZE", 2)
+    DB_ASYNC_MAX_OVERFLOW: int = os.getenv("DB_ASYNC_MAX_OVERFLOW", 3)
+    DB_POOL_TIMEOUT: int = os.getenv("DB_POOL_TIMEOUT", 30)
+    DB_POOL_RECYCLE: int = os.getenv("DB_POOL_RECYCLE", 1800)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", True)
+    # Set when connecting through a transaction-mode pooler such as PgBouncer
+    DB_EXTERNAL_POOLER: bool = os.getenv("DB_EXTERNAL_POOLER", False)
     PROJECT_NAME: str = os.getenv("PROJECT_NAME", "")
     PROJECT_DESCRIPTION: str = os.getenv("PROJECT_DESCRIPTION", "")
     PROJECT_SUMMARY: str = os.getenv("PROJECT_SUMMARY", "")
@@ -22,6 +41,22 @@ class Settings(BaseSettings):
     MAIL_FROM_NAME: str = os.getenv("MAIL_DEFAULT_SENDER_NAME", "")
     MAIL_PORT: int = os.getenv("MAIL_PORT", 587)
     ALLOW_ORIGINS: str = os.getenv("ALLOW_ORIGINS", "http://127.0.0.1:8080")
+    # Warn when a request runs the same SQL statement more than this many times
+    SQL_REPEATED_STATEMENT_THRESHOLD: int = os.getenv(
+        "SQL_REPEATED_STATEMENT_THRESHOLD", 10
+    )
+    PAGINATION_COUNT_CACHE_TTL: int = os.getenv("PAGINATION_COUNT_CACHE_TTL", 300)
+    PAGINATION_COUNT_CACHE_SIZE: int = os.getenv("PAGINATION_COUNT_CACHE_SIZE", 1024)
+    # Rendered invoice PDFs, kept on disk and the most recent ones in memory too
+    INVOICE_PDF_CACHE_DIR: str = os.getenv(
+        "INVOICE_PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "w4lkies-invoices")
+    )
+    INVOICE_PDF_CACHE_SIZE: int = os.getenv("INVOICE_PDF_CACHE_SIZE", 32)
+    # Threads that render invoice PDFs and how many renders may be running or
+    # waiting before further downloads are turned away with a 503
+    INVOICE_RENDER_WORKERS: int = os.getenv("INVOICE_RENDER_WORKERS", 2)
+    INVOICE_RENDER_MAX_PENDING: int = os.getenv("INVOICE_RENDER_MAX_PENDING", 8)
+    INVOICE_RENDER_RETRY_AFTER: int = os.getenv("INVOICE_RENDER_RETRY_AFTER", 5)
 
 
 settings = Settings()
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions import NotFoundError
+from models import Booking, Customer
+
+
+async def get_customers(
+    db: AsyncSession, is_active: Optional[bool] = None
+) -> list[Customer]:
+    date_min = date.today() - timedelta(days=28 * 2)
+    booking_count = func.count(Booking.booking_id).label("booking_count")
+
+    # Base query with join and booking date filter
+    query = (
+        select(Customer)
+        .outerjoin(
+            Booking,
+            and_(
+                Booking.customer_id == Customer.customer_id,
+                Booking.date >= date_min,
+            ),
+        )
+        .group_by(Customer.customer_id)
+        .order_by(booking_count.desc(), Customer.name.asc())
+    )
+
+    # Apply is_active filter if provided
+    if is_active is not None:
+        query = query.filter(Customer.is_active == is_active)
+
+    customers = (await db.scalars(query)).all()
+    return customers
+
+
+async def get_customer_by_id(db: AsyncSession, customer_id: int) -> Customer:
+    customer = await db.get(Customer, customer_id)
+    logger.debug(f"{customer = }")
+    if not customer:
+        raise NotFoundError(f"Customer {customer_id} not found")
+    return customer
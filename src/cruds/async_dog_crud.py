@@ -0,0 +1,22 @@
+from loguru import logger
+from sqlalchemy import distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from models import Dog
+
+
+async def get_dogs(db: AsyncSession) -> list[Dog]:
+    # Relationships can't be lazy loaded on an AsyncSession, so load them up front
+    query = select(Dog).options(selectinload(Dog.customer), selectinload(Dog.vet))
+    query = query.order_by(Dog.name)
+    dogs = (await db.scalars(query)).all()
+    return dogs
+
+
+async def get_dog_breeds(db: AsyncSession) -> list[str]:
+    query = select(distinct(Dog.breed))
+    query = query.order_by(Dog.breed)
+    dog_breeds = (await db.scalars(query)).all()
+    logger.debug(f"{dog_breeds = }")
+    return dog_breeds
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions import NotFoundError
+from models import Booking, Service
+
+
+async def get_services(
+    db: AsyncSession,
+    is_active: Optional[bool] = None,
+    is_publicly_offered: Optional[bool] = None,
+) -> list[Service]:
+    one_year_ago = date.today() - timedelta(days=365)
+    booking_count = func.count(Booking.booking_id).label("booking_count")
+
+    query = (
+        select(Service)
+        .outerjoin(
+            Booking,
+            and_(
+                Booking.service_id == Service.service_id, Booking.date >= one_year_ago
+            ),
+        )
+        .group_by(Service.service_id)
+        .order_by(booking_count.desc())
+    )
+
+    if is_active is not None:
+        query = query.filter(Service.is_active == is_active)
+    if is_publicly_offered is not None:
+        query = query.filter(Service.is_publicly_offered == is_publicly_offered)
+
+    services = (await db.scalars(query)).all()
+    return services
+
+
+async def get_service_by_id(db: AsyncSession, service_id: int) -> Service:
+    service = await db.get(Service, service_id)
+    if not service:
+        raise NotFoundError(f"Service {service_id} not found")
+    return service
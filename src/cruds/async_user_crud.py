@@ -0,0 +1,20 @@
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User
+
+
+async def get_users(db: AsyncSession, is_active: Optional[bool] = None) -> list[User]:
+    query = select(User)
+    if is_active is not None:
+        query = query.filter_by(is_active=is_active)
+    users = (await db.scalars(query)).all()
+    return users
+
+
+async def get_user_by_name(db: AsyncSession, name: str) -> Optional[User]:
+    query = select(User).filter_by(name=name).limit(1)
+    return await db.scalar(query)
@@ -0,0 +1,19 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions import NotFoundError
+from models import Vet
+
+
+async def get_vets(db: AsyncSession) -> list[Vet]:
+    query = select(Vet)
+    query = query.order_by(Vet.name)
+    vets = (await db.scalars(query)).all()
+    return vets
+
+
+async def get_vet_by_id(db: AsyncSession, vet_id: int) -> Vet:
+    vet = await db.get(Vet, vet_id)
+    if not vet:
+        raise NotFoundError(f"Vet {vet_id} not found")
+    return vet
@@ -1,39 +1,136 @@
 from datetime import datetime, timedelta, time
+from collections import Counter
+from functools import lru_cache
+from itertools import groupby
 from typing import Optional
 
 from fastapi import Response
 from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import delete, extract, func, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
 
 from database import SessionLocal
-from exceptions import NotFoundError, DatabaseError
-from models import Booking, User
-from pagination import paginate
-from schemas.booking_schema import BookingCreateSchema, BookingUpdateSchema
+from exceptions import ConflictError, NotFoundError, DatabaseError
+from services import booking_availability_service
+from models import Booking, Customer, Service, User
+from pagination import invalidate_count_cache, paginate
+from schemas.booking_schema import (
+    BookingBulkUpdateSchema,
+    BookingCreateSchema,
+    BookingRecurringCreateSchema,
+    BookingSnippetSchema,
+    BookingUpdateSchema,
+)
 from schemas.pagination_schema import PaginationParamsSchema
 from datetime import date, datetime
 
+BOOKING_TIME_INTERVAL_MINUTES = 15
 
+
+@lru_cache(maxsize=32)
 def get_booking_time_choices(
-    db: SessionLocal,
     start_hour: int = 8,
     end_hour: int = 18,
-    interval_minutes: int = 15,
-) -> list:
-    working_hours_start = time(start_hour, 0)
-    working_hours_end = time(end_hour, 0)
-    time_interval = timedelta(minutes=interval_minutes)
+    interval_minutes: int = BOOKING_TIME_INTERVAL_MINUTES,
+) -> tuple[tuple[str, str], ...]:
+    """Returns (value, label) pairs, e.g. ("13:45:00", "01:45 PM"), for each slot.
+
+    The grid only depends on its arguments, so it is built once and memoized.
+    """
     time_choices = []
-    current_time = datetime.combine(datetime.today(), working_hours_start)
-    end_time = datetime.combine(datetime.today(), working_hours_end)
-    while current_time <= end_time:
-        time_choice = (
-            current_time.strftime("%H:%M:%S"),
-            current_time.strftime("%I:%M %p"),
+    for minutes in range(start_hour * 60, end_hour * 60 + 1, interval_minutes):
+        hour, minute = divmod(minutes, 60)
+        period = "AM" if hour < 12 else "PM"
+        time_choices.append(
+            (
+                f"{hour:02d}:{minute:02d}:00",
+                f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {period}",
+            )
         )
-        time_choices.append(time_choice)
-        current_time += time_interval
-    logger.debug(f"{time_choices = }")
-    return time_choices
+    return tuple(time_choices)
+
+
+BOOKING_RELATIONSHIPS = ("customer", "service", "user")
+BOOKING_LOAD_STRATEGIES = {"joined": joinedload, "selectin": selectinload}
+
+
+def _get_booking_row(booking: Booking) -> dict:
+    return {
+        "booking_id": booking.booking_id,
+        "date": booking.date,
+        "time": booking.time,
+        "service_id": booking.service_id,
+        "user_id": booking.user_id,
+    }
+
+
+def _get_service_duration(
+    db: SessionLocal, service_id: Optional[int], default: int
+) -> int:
+    if service_id is None:
+        return default
+    durations = booking_availability_service.get_service_durations(db, [service_id])
+    if service_id not in durations:
+        raise NotFoundError(f"Service {service_id} not found")
+    return durations[service_id]
+
+
+def get_free_booking_slots(
+    db: SessionLocal,
+    user_id: int,
+    date_min: datetime,
+    date_max: datetime,
+    service_id: Optional[int] = None,
+) -> dict:
+    duration_minutes = _get_service_duration(
+        db, service_id, booking_availability_service.DEFAULT_DURATION_MINUTES
+    )
+    return booking_availability_service.get_free_slots(
+        db,
+        user_id,
+        date_min,
+        date_max,
+        get_booking_time_choices(),
+        duration_minutes,
+    )
+
+
+def get_booking_availability(
+    db: SessionLocal,
+    user_id: int,
+    date_min: datetime,
+    date_max: datetime,
+    service_id: Optional[int] = None,
+) -> dict:
+    # Without a service, a time choice is taken if any booking overlaps it
+    duration_minutes = _get_service_duration(
+        db, service_id, BOOKING_TIME_INTERVAL_MINUTES
+    )
+    time_choices = get_booking_time_choices()
+    days = booking_availability_service.get_availability_bitmaps(
+        db, user_id, date_min, date_max, time_choices, duration_minutes
+    )
+    return {
+        "time_choices": [value for value, _ in time_choices],
+        "days": days,
+    }
+
+
+def get_booking_load_options(
+    schema: type[BaseModel], load_strategy: str = "joined"
+) -> list:
+    """Returns the loader options for the relationships a response schema reads.
+
+    "joined" loads them in the same statement as the bookings, "selectin" with one
+    extra statement per relationship, rather than one lazy load per booking.
+    """
+    loader = BOOKING_LOAD_STRATEGIES[load_strategy]
+    return [
+        loader(getattr(Booking, relationship))
+        for relationship in BOOKING_RELATIONSHIPS
+        if relationship in schema.model_fields
+    ]
 
 
 def get_bookings(
@@ -45,8 +142,13 @@ def get_bookings(
     date_min: Optional[str] = None,
     date_max: Optional[str] = None,
     order_by: Optional[tuple] = (Booking.date.desc(), Booking.time.asc()),
+    schema: Optional[type[BaseModel]] = None,
+    load_strategy: str = "joined",
+    yield_per: Optional[int] = None,
 ) -> dict:
     query = db.query(Booking)
+    if schema is not None:
+        query = query.options(*get_booking_load_options(schema, load_strategy))
     if user_id and int(user_id) > -1:
         query = query.filter(Booking.user_id == user_id)
     if customer_id and int(customer_id) > -1:
@@ -56,9 +158,14 @@ def get_bookings(
     if date_max:
         query = query.filter(Booking.date < date_max)
     if order_by:
+        # Tie-break on the primary key so the order (and keyset cursor) is unique
+        order_by = (*order_by, Booking.booking_id.asc())
         query = query.order_by(*order_by)
     if pagination_params is not None and response is not None:
-        results = paginate(query, pagination_params, response)
+        results = paginate(query, pagination_params, response, keyset=order_by)
+    elif yield_per is not None:
+        # Iterate with a server-side cursor, fetching `yield_per` rows at a time
+        results = query.yield_per(yield_per)
     else:
         results = query.all()
     return results
@@ -70,6 +177,8 @@ def get_upcoming_bookings(
     response: Response,
     user_id: Optional[int] = None,
     customer_id: Optional[int] = None,
+    schema: Optional[type[BaseModel]] = None,
+    load_strategy: str = "joined",
 ) -> dict:
     results = get_bookings(
         db=db,
@@ -79,6 +188,8 @@ def get_upcoming_bookings(
         date_min=datetime.now().date(),
         order_by=(Booking.date.asc(), Booking.time.asc()),
         pagination_params=pagination_params,
+        schema=schema,
+        load_strategy=load_strategy,
     )
     return results
 
@@ -89,6 +200,8 @@ def get_historic_bookings(
     response: Response,
     user_id: Optional[int] = None,
     customer_id: Optional[int] = None,
+    schema: Optional[type[BaseModel]] = None,
+    load_strategy: str = "joined",
 ) -> tuple[list[Booking], int]:
     results = get_bookings(
         db=db,
@@ -98,10 +211,171 @@ def get_historic_bookings(
         order_by=(Booking.date.desc(), Booking.time.asc()),
         pagination_params=pagination_params,
         response=response,
+        schema=schema,
+        load_strategy=load_strategy,
     )
     return results
 
 
+def get_booking_schedule(db: SessionLocal, schedule_date: date) -> dict:
+    """Returns a day's bookings grouped by walker, loaded in a single query."""
+    query = (
+        db.query(Booking)
+        .options(
+            joinedload(Booking.customer).joinedload(Customer.dogs),
+            joinedload(Booking.service),
+            joinedload(Booking.user),
+        )
+        .filter(Booking.date == schedule_date)
+        # Bookings without a walker come last
+        .order_by(
+            Booking.user_id.is_(None),
+            Booking.user_id,
+            Booking.time,
+            Booking.booking_id,
+        )
+    )
+    walkers = []
+    for user_id, bookings in groupby(query.all(), key=lambda booking: booking.user_id):
+        bookings = list(bookings)
+        user = bookings[0].user
+        walkers.append(
+            {
+                "user_id": user_id,
+                "username": user.username if user else None,
+                "bookings": bookings,
+            }
+        )
+    return {"date": schedule_date, "walkers": walkers}
+
+
+def get_booking_calendar_version(
+    db: SessionLocal, user_id: int, date_min: date
+) -> tuple[Optional[datetime], int]:
+    """Returns when a walker's bookings were last updated and how many there are."""
+    query = select(func.max(Booking.updated_at), func.count()).where(
+        Booking.user_id == user_id, Booking.date >= date_min
+    )
+    updated_at, count = db.execute(query).one()
+    return updated_at, count
+
+
+BOOKING_EXPORT_COLUMNS = (
+    Booking.booking_id,
+    Booking.date,
+    Booking.time,
+    Booking.customer_id,
+    Customer.name.label("customer_name"),
+    Booking.service_id,
+    Service.name.label("service_name"),
+    Service.price.label("service_price"),
+    Booking.user_id,
+    User.name.label("user_name"),
+    Booking.invoice_id,
+)
+
+
+def get_booking_export_rows(
+    db: SessionLocal,
+    date_min: Optional[date] = None,
+    date_max: Optional[date] = None,
+    yield_per: int = 1000,
+):
+    """Yields bookings as plain tuples in the order of `BOOKING_EXPORT_COLUMNS`.
+
+    Rows are fetched `yield_per` at a time through a server-side cursor, without
+    building ORM objects, so memory use doesn't grow with the date range.
+    """
+    query = (
+        select(*BOOKING_EXPORT_COLUMNS)
+        .join(Customer, Booking.customer_id == Customer.customer_id)
+        .join(Service, Booking.service_id == Service.service_id)
+        .outerjoin(User, Booking.user_id == User.user_id)
+        .order_by(Booking.date, Booking.time, Booking.booking_id)
+        .execution_options(yield_per=yield_per)
+    )
+    if date_min:
+        query = query.where(Booking.date >= date_min)
+    if date_max:
+        query = query.where(Booking.date < date_max)
+    for row in db.execute(query):
+        yield tuple(row)
+
+
+def get_booking_stats(
+    db: SessionLocal,
+    date_min: Optional[date] = None,
+    date_max: Optional[date] = None,
+    user_id: Optional[int] = None,
+) -> dict:
+    """Returns booking counts by day, ISO week, weekday and hour, walker and service.
+
+    Counts are grouped in the database. Days, weeks and weekdays are all derived
+    from one GROUP BY date and hour, so only walkers and services need queries of
+    their own.
+    """
+    filters = []
+    if date_min:
+        filters.append(Booking.date >= date_min)
+    if date_max:
+        filters.append(Booking.date < date_max)
+    if user_id is not None:
+        filters.append(Booking.user_id == user_id)
+
+    hour = extract("hour", Booking.time)
+    day_hour_query = (
+        select(Booking.date, hour, func.count())
+        .where(*filters)
+        .group_by(Booking.date, hour)
+    )
+    days = Counter()
+    weeks = Counter()
+    weekday_hours = Counter()
+    for booking_date, booking_hour, count in db.execute(day_hour_query):
+        iso_year, iso_week, _ = booking_date.isocalendar()
+        days[booking_date] += count
+        weeks[(iso_year, iso_week)] += count
+        weekday_hours[(booking_date.weekday(), int(booking_hour))] += count
+
+    walker_query = (
+        select(Booking.user_id, User.name, func.count())
+        .outerjoin(User, Booking.user_id == User.user_id)
+        .where(*filters)
+        .group_by(Booking.user_id, User.name)
+        .order_by(func.count().desc())
+    )
+    service_query = (
+        select(Booking.service_id, Service.name, func.count())
+        .join(Service, Booking.service_id == Service.service_id)
+        .where(*filters)
+        .group_by(Booking.service_id, Service.name)
+        .order_by(func.count().desc())
+    )
+    return {
+        "total": sum(days.values()),
+        "by_day": [
+            {"date": booking_date, "count": count}
+            for booking_date, count in sorted(days.items())
+        ],
+        "by_iso_week": [
+            {"year": year, "week": week, "count": count}
+            for (year, week), count in sorted(weeks.items())
+        ],
+        "by_weekday_hour": [
+            {"weekday": weekday, "hour": booking_hour, "count": count}
+            for (weekday, booking_hour), count in sorted(weekday_hours.items())
+        ],
+        "by_walker": [
+            {"user_id": walker_id, "username": name, "count": count}
+            for walker_id, name, count in db.execute(walker_query)
+        ],
+        "by_service": [
+            {"service_id": service_id, "name": name, "count": count}
+            for service_id, name, count in db.execute(service_query)
+        ],
+    }
+
+
 def get_booking_by_id(db: SessionLocal, booking_id: int) -> Booking:
     booking = db.get(Booking, booking_id)
     logger.debug(f"{booking = }")
@@ -132,9 +406,18 @@ def update_booking_by_id(
     if user_id := booking_data.user_id:
         booking.user_id = user_id
 
+    try:
+        booking_availability_service.check_booking_conflicts(
+            db, [_get_booking_row(booking)]
+        )
+    except ConflictError:
+        db.rollback()
+        raise
+
     try:
         booking.updated_by = current_user.user_id
         db.commit()
+        invalidate_count_cache(Booking.__tablename__)
         return booking
     except Exception as e:
         detail = f"Error updating booking: {e}"
@@ -154,10 +437,18 @@ def add_booking(
         service_id=booking_data.service_id,
         user_id=booking_data.user_id,
     )
+    try:
+        booking_availability_service.check_booking_conflicts(
+            db, [_get_booking_row(booking)]
+        )
+    except ConflictError:
+        db.rollback()
+        raise
     try:
         booking.created_by = current_user.user_id
         db.add(booking)
         db.commit()
+        invalidate_count_cache(Booking.__tablename__)
         return booking
     except Exception as e:
         detail = f"Error adding booking: {e}"
@@ -173,5 +464,170 @@ def delete_booking_by_id(db: SessionLocal, booking_id: int):
     try:
         db.delete(booking)
         db.commit()
+        invalidate_count_cache(Booking.__tablename__)
     except Exception as e:
         raise DatabaseError("An error occurred while deleting the booking.")
+
+
+def _check_booking_references(db: SessionLocal, rows: list[dict]):
+    # One query per referenced table, rather than one per booking
+    for model, key in (
+        (Customer, "customer_id"),
+        (Service, "service_id"),
+        (User, "user_id"),
+    ):
+        ids = {row[key] for row in rows if row.get(key) is not None}
+        if not ids:
+            continue
+        column = getattr(model, key)
+        found_ids = set(db.scalars(select(column).where(column.in_(ids))))
+        if missing_ids := sorted(ids - found_ids):
+            raise NotFoundError(f"{model.__name__} {missing_ids} not found")
+
+
+def _add_booking_rows(
+    db: SessionLocal, current_user: User, rows: list[dict]
+) -> list[Booking]:
+    _check_booking_references(db, rows)
+    try:
+        booking_availability_service.check_booking_conflicts(db, rows)
+    except ConflictError:
+        db.rollback()
+        raise
+    rows = [
+        {**row, "created_by": current_user.user_id, "updated_by": current_user.user_id}
+        for row in rows
+    ]
+    try:
+        # Sent as batched multi-row INSERT statements in a single transaction
+        booking_ids = db.scalars(insert(Booking).returning(Booking.booking_id), rows)
+        booking_ids = booking_ids.all()
+        db.commit()
+        invalidate_count_cache(Booking.__tablename__)
+    except Exception as e:
+        detail = f"Error adding bookings: {e}"
+        logger.error(detail)
+        db.rollback()
+        raise DatabaseError("An error occurred while adding bookings.")
+    query = (
+        db.query(Booking)
+        .options(*get_booking_load_options(BookingSnippetSchema))
+        .filter(Booking.booking_id.in_(booking_ids))
+        .order_by(Booking.date.asc(), Booking.time.asc(), Booking.booking_id.asc())
+    )
+    return query.all()
+
+
+def add_bookings(
+    db: SessionLocal, current_user: User, bookings_data: list[BookingCreateSchema]
+) -> list[Booking]:
+    logger.debug(f"{len(bookings_data) = }")
+    rows = [
+        {
+            "date": booking_data.date.date(),
+            "time": booking_data.time,
+            "customer_id": booking_data.customer_id,
+            "service_id": booking_data.service_id,
+            "user_id": booking_data.user_id,
+        }
+        for booking_data in bookings_data
+    ]
+    return _add_booking_rows(db, current_user, rows)
+
+
+def add_recurring_bookings(
+    db: SessionLocal, current_user: User, recurring_data: BookingRecurringCreateSchema
+) -> list[Booking]:
+    logger.debug(f"{recurring_data = }")
+    weekdays = set(recurring_data.weekdays)
+    date_start = recurring_data.date_start.date()
+    number_of_days = (recurring_data.date_end.date() - date_start).days + 1
+    rows = [
+        {
+            "date": booking_date,
+            "time": recurring_data.time,
+            "customer_id": recurring_data.customer_id,
+            "service_id": recurring_data.service_id,
+            "user_id": recurring_data.user_id,
+        }
+        for booking_date in (
+            date_start + timedelta(days=days) for days in range(number_of_days)
+        )
+        if booking_date.weekday() in weekdays
+    ]
+    if not rows:
+        return []
+    return _add_booking_rows(db, current_user, rows)
+
+
+BOOKING_BULK_RESULT_COLUMNS = (
+    Booking.booking_id,
+    Booking.date,
+    Booking.time,
+    Booking.customer_id,
+    Booking.service_id,
+    Booking.user_id,
+)
+BOOKING_SCHEDULE_FIELDS = {"date", "time", "service_id", "user_id"}
+
+
+def _execute_bulk_statement(db: SessionLocal, statement, booking_ids: set[int]):
+    # Runs an UPDATE/DELETE ... RETURNING and commits it only if every booking
+    # it targets exists
+    try:
+        rows = db.execute(
+            statement, execution_options={"synchronize_session": False}
+        ).all()
+        missing_ids = sorted(booking_ids - {row.booking_id for row in rows})
+        if missing_ids:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception as e:
+        detail = f"Error changing bookings: {e}"
+        logger.error(detail)
+        db.rollback()
+        raise DatabaseError("An error occurred while changing bookings.")
+    if missing_ids:
+        raise NotFoundError(f"Bookings {missing_ids} not found")
+    invalidate_count_cache(Booking.__tablename__)
+    return rows
+
+
+def update_bookings(
+    db: SessionLocal, current_user: User, booking_data: BookingBulkUpdateSchema
+) -> list:
+    logger.debug(f"{booking_data = }")
+    booking_ids = set(booking_data.booking_ids)
+    values = booking_data.model_dump(exclude={"booking_ids"}, exclude_none=True)
+    if "date" in values:
+        values["date"] = values["date"].date()
+    _check_booking_references(db, [values])
+    if BOOKING_SCHEDULE_FIELDS & values.keys():
+        query = select(*BOOKING_BULK_RESULT_COLUMNS).where(
+            Booking.booking_id.in_(booking_ids)
+        )
+        rows = [{**row, **values} for row in db.execute(query).mappings()]
+        try:
+            booking_availability_service.check_booking_conflicts(db, rows)
+        except ConflictError:
+            db.rollback()
+            raise
+    statement = (
+        update(Booking)
+        .where(Booking.booking_id.in_(booking_ids))
+        .values(**values, updated_by=current_user.user_id)
+        .returning(*BOOKING_BULK_RESULT_COLUMNS)
+    )
+    return _execute_bulk_statement(db, statement, booking_ids)
+
+
+def delete_bookings(db: SessionLocal, booking_ids: list[int]) -> list:
+    logger.debug(f"{booking_ids = }")
+    booking_ids = set(booking_ids)
+    statement = (
+        delete(Booking)
+        .where(Booking.booking_id.in_(booking_ids))
+        .returning(*BOOKING_BULK_RESULT_COLUMNS)
+    )
+    return _execute_bulk_statement(db, statement, booking_ids)
@@ -8,7 +8,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from database import SessionLocal
 from exceptions import NotFoundError, DatabaseError
 from models import User, Customer, Expense, Vet
-from pagination import paginate
+from pagination import invalidate_count_cache, paginate
 from schemas.expense_schema import ExpenseUpdateSchema, ExpenseCreateSchema
 from schemas.pagination_schema import PaginationParamsSchema
 
@@ -18,9 +18,10 @@ def get_expenses(
     pagination_params: PaginationParamsSchema,
     response: Response,
 ) -> list[Expense]:
+    order_by = (desc(Expense.date), desc(Expense.expense_id))
     query = db.query(Expense)
-    query = query.order_by(desc(Expense.date))
-    results = paginate(query, pagination_params, response)
+    query = query.order_by(*order_by)
+    results = paginate(query, pagination_params, response, keyset=order_by)
     return results
 
 
@@ -71,6 +72,7 @@ def update_expense_by_id(
     try:
         expense.updated_by = current_user.user_id
         db.commit()
+        invalidate_count_cache(Expense.__tablename__)
         return expense
     except Excpetion as e:
         detail = f"Error updating expense: {e}"
@@ -93,6 +95,7 @@ def add_expense(
         expense.created_by = current_user.user_id
         db.add(expense)
         db.commit()
+        invalidate_count_cache(Expense.__tablename__)
         return expense
     except SQLAlchemyError as e:
         detail = f"Error adding expense: {e}"
@@ -108,5 +111,6 @@ def delete_expense_by_id(db: SessionLocal, expense_id: int):
     try:
         db.delete(expense)
         db.commit()
+        invalidate_count_cache(Expense.__tablename__)
     except Exception as e:
         raise DatabaseError("An error occurred while deleting the expense.")
@@ -1,34 +1,68 @@
 from datetime import datetime, timedelta
+from decimal import Decimal
 import hashlib
+from io import BytesIO
+from types import SimpleNamespace
 from typing import Optional
 
+from fastapi import Response
 from loguru import logger
-from sqlalchemy import desc
+from sqlalchemy import desc, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
 from cruds import booking_crud
 from database import SessionLocal
-from exceptions import NotFoundError, DatabaseError
-from models import Invoice, User
+from exceptions import ConflictError, NotFoundError, DatabaseError
+from models import Booking, Invoice, Service, User
+from pagination import invalidate_count_cache, paginate
+from schemas.booking_schema import BookingSnippetSchema
 from schemas.invoice_schema import InvoiceCreateSchema
 from schemas.invoice_schema import InvoiceGenerateSchema
-from services import invoice_download_service
+from schemas.pagination_schema import PaginationParamsSchema
+from services import invoice_pdf_cache_service
+
+
+def get_invoice_load_options() -> list:
+    # The customer is joined into the page's statement and the bookings (with the
+    # relationships a booking snippet reads) are loaded in one more statement
+    return [
+        joinedload(Invoice.customer),
+        selectinload(Invoice.bookings).options(
+            *booking_crud.get_booking_load_options(BookingSnippetSchema)
+        ),
+    ]
 
 
 def get_invoices(
     db: SessionLocal,
+    pagination_params: Optional[PaginationParamsSchema] = None,
+    response: Optional[Response] = None,
+    customer_id: Optional[int] = None,
+    is_paid: Optional[bool] = None,
     date_min: Optional[str] = None,
     date_max: Optional[str] = None,
 ) -> list[Invoice]:
-    query = db.query(Invoice)
+    query = db.query(Invoice).options(*get_invoice_load_options())
+    if customer_id is not None:
+        query = query.filter(Invoice.customer_id == customer_id)
+    if is_paid is True:
+        query = query.filter(Invoice.date_paid.is_not(None))
+    elif is_paid is False:
+        query = query.filter(Invoice.date_paid.is_(None))
     if date_min:
         logger.debug(f"{date_min = }")
         query = query.filter(Invoice.date_issued >= date_min)
     if date_max:
         logger.debug(f"{date_max = }")
         query = query.filter(Invoice.date_issued <= date_max)
-    query = query.order_by(desc(Invoice.date_issued))
-    invoices = query.all()
-    invoices = invoices[:50]
+    # Tie-break on the primary key so the order (and keyset cursor) is unique
+    order_by = (desc(Invoice.date_issued), desc(Invoice.invoice_id))
+    query = query.order_by(*order_by)
+    if pagination_params is not None and response is not None:
+        invoices = paginate(query, pagination_params, response, keyset=order_by)
+    else:
+        invoices = query.all()
     logger.debug(f"{len(invoices) = }")
     return invoices
 
@@ -40,17 +74,54 @@ def get_invoice_by_id(db: SessionLocal, invoice_id: int) -> Invoice:
     return invoice
 
 
-def download_invoice_by_id(db: SessionLocal, invoice_id: int):
-    invoice = get_invoice_by_id(db, invoice_id)
+def get_invoice_render_inputs(db: SessionLocal, invoice_id: int) -> SimpleNamespace:
+    query = (
+        db.query(Invoice)
+        .options(*get_invoice_load_options())
+        .filter(Invoice.invoice_id == invoice_id)
+    )
+    invoice = query.one_or_none()
+    if not invoice:
+        raise NotFoundError(f"Invoice {invoice_id} not found")
+    return invoice_pdf_cache_service.get_render_inputs(invoice)
+
+
+def get_cached_invoice_pdf(render_inputs: SimpleNamespace):
+    """Returns the cached invoice PDF and its filename, or None if not rendered yet."""
+    pdf_bytes = invoice_pdf_cache_service.get_cached_pdf(render_inputs.key)
+    if pdf_bytes is None:
+        return None
+    logger.debug(f"Serving cached {render_inputs.key}")
+    return BytesIO(pdf_bytes), render_inputs.filename
+
+
+def render_invoice_pdf(render_inputs: SimpleNamespace):
+    """Renders the invoice PDF, caches it and returns it with its filename."""
+    # Imported here as reportlab is slow to import and only needed for downloads
+    from services import invoice_download_service
 
     try:
-        pdf_file, pdf_filepath = invoice_download_service.create(invoice)
+        pdf_file, pdf_filepath = invoice_download_service.create(render_inputs)
         logger.debug(f"Created {pdf_filepath}, {type(pdf_file)}")
-        return pdf_file, pdf_filepath
     except Exception as e:
-        detail = f"An error occurred downloading invoice {invoice_id}: {e}"
+        detail = f"An error occurred downloading invoice {render_inputs.reference}: {e}"
         logger.error(detail)
         raise DatabaseError(detail)
+    invoice_pdf_cache_service.set_cached_pdf(render_inputs.key, pdf_file.getvalue())
+    return pdf_file, pdf_filepath
+
+
+def download_invoice(render_inputs: SimpleNamespace):
+    """Returns the invoice PDF and its filename, rendering it only if not cached."""
+    cached = get_cached_invoice_pdf(render_inputs)
+    if cached is not None:
+        return cached
+    return render_invoice_pdf(render_inputs)
+
+
+def download_invoice_by_id(db: SessionLocal, invoice_id: int):
+    render_inputs = get_invoice_render_inputs(db, invoice_id)
+    return download_invoice(render_inputs)
 
 
 def mark_invoice_paid_by_id(
@@ -63,6 +134,7 @@ def mark_invoice_paid_by_id(
         invoice.date_paid = datetime.utcnow()
         invoice.updated_by = current_user.user_id
         db.commit()
+        invalidate_count_cache(Invoice.__tablename__)
         return invoice
     except SQLAlchemyError as e:
         detail = f"Error updating invoice date paid: {e}"
@@ -88,8 +160,19 @@ def add_invoice(db: SessionLocal, current_user: User, invoice_data: dict) -> Inv
     )
     try:
         invoice.created_by = current_user.user_id
+        invoice.updated_by = current_user.user_id
         db.add(invoice)
+        if booking_filters := invoice_data.get("booking_filters"):
+            # Link the bookings with one UPDATE instead of loading each of them
+            db.flush()
+            db.execute(
+                update(Booking)
+                .where(*booking_filters)
+                .values(invoice_id=invoice.invoice_id),
+                execution_options={"synchronize_session": False},
+            )
         db.commit()
+        invalidate_count_cache(Invoice.__tablename__, Booking.__tablename__)
         return invoice
     except SQLAlchemyError as e:
         detail = f"Error adding invoice: {e}"
@@ -98,35 +181,83 @@ def add_invoice(db: SessionLocal, current_user: User, invoice_data: dict) -> Inv
         raise DatabaseError("An error occurred while adding an invoice.")
 
 
-def generate_invoice_data(
-    db: SessionLocal, customer_id: int, date_start: str, date_end: str
-) -> dict:
-    reference_prefix = "W4LKIES"
-    days_due = 7
+INVOICE_DAYS_DUE = 7
+PRICE_PRECISION = Decimal("0.01")
 
-    # Get unique reference for invoice
+
+def _to_decimal(value: float) -> Decimal:
+    # Prices are stored as floats, so go through their shortest repr, e.g. 10.1
+    # rather than 10.0999999999999996447286321199499070644378662109375
+    return Decimal(str(value)).quantize(PRICE_PRECISION)
+
+
+def get_invoice_reference(
+    customer_id: int, date_start: datetime, date_end: datetime
+) -> str:
+    reference_prefix = "W4LKIES"
     reference_hash = (
         hashlib.sha256(f"{customer_id}-{date_start}-{date_end}".encode("UTF-8"))
         .hexdigest()[:8]
         .upper()
     )
-    reference = f"{reference_prefix}-{reference_hash}"
-
-    # Get the customer bookings.
-    bookings = booking_crud.get_bookings(
-        db=db,
-        pagination_params=None,
-        response=None,
-        date_min=date_start,
-        date_max=date_end,
-        customer_id=customer_id,
+    return f"{reference_prefix}-{reference_hash}"
+
+
+def get_invoice_booking_filters(
+    date_start: datetime, date_end: datetime, customer_id: Optional[int] = None
+) -> list:
+    # Booking.date is a date, and SQLite would compare it to a datetime as text
+    if isinstance(date_start, datetime):
+        date_start = date_start.date()
+    if isinstance(date_end, datetime):
+        date_end = date_end.date()
+    filters = [Booking.date >= date_start, Booking.date < date_end]
+    if customer_id is not None:
+        filters.append(Booking.customer_id == customer_id)
+    return filters
+
+
+def _get_breakdown_line(service_id: int, name: str, price: float, count: int) -> dict:
+    price = _to_decimal(price)
+    return {
+        "service_id": service_id,
+        "name": name,
+        "price": price,
+        "count": count,
+        "total": price * count,
+    }
+
+
+def get_invoice_breakdown(db: SessionLocal, booking_filters: list) -> list[dict]:
+    """Returns the number and total price of the bookings per service."""
+    query = (
+        select(
+            Service.service_id,
+            Service.name,
+            Service.price,
+            func.count(Booking.booking_id),
+        )
+        .join(Service, Booking.service_id == Service.service_id)
+        .where(*booking_filters)
+        .group_by(Service.service_id, Service.name, Service.price)
+        .order_by(Service.name)
     )
+    return [_get_breakdown_line(*row) for row in db.execute(query)]
+
+
+def generate_invoice_data(
+    db: SessionLocal, customer_id: int, date_start: str, date_end: str
+) -> dict:
+    # Get unique reference for invoice
+    reference = get_invoice_reference(customer_id, date_start, date_end)
+
+    # Get the number and price of the customer's bookings per service
+    booking_filters = get_invoice_booking_filters(date_start, date_end, customer_id)
+    breakdown = get_invoice_breakdown(db, booking_filters)
 
     # Get the total price of the bookings
-    price_subtotal = 0.0
-    price_discount = 0.0
-    for booking in bookings:
-        price_subtotal += booking.service.price
+    price_subtotal = sum((line["total"] for line in breakdown), Decimal("0.00"))
+    price_discount = Decimal("0.00")
     price_total = price_subtotal - price_discount
     logger.debug(f"{price_discount = } {price_total = }")
 
@@ -135,12 +266,15 @@ def generate_invoice_data(
         "date_start": date_start,
         "date_end": date_end,
         "date_issued": datetime.now(),
-        "date_due": datetime.now() + timedelta(days=days_due),
-        "price_subtotal": price_subtotal,
-        "price_discount": price_discount,
-        "price_total": price_total,
+        "date_due": datetime.now() + timedelta(days=INVOICE_DAYS_DUE),
+        # The price columns are floats, so convert once the sums are exact
+        "price_subtotal": float(price_subtotal),
+        "price_discount": float(price_discount),
+        "price_total": float(price_total),
         "customer_id": customer_id,
-        "bookings": bookings,
+        "booking_count": sum(line["count"] for line in breakdown),
+        "breakdown": breakdown,
+        "booking_filters": booking_filters,
     }
 
     return invoice_data
@@ -159,3 +293,123 @@ def generate_invoice(
     logger.info(f"{new_invoice = }")
     logger.info(f"{new_invoice.bookings = }")
     return new_invoice
+
+
+def generate_invoices(
+    db: SessionLocal, current_user: User, date_start: datetime, date_end: datetime
+) -> list[dict]:
+    """Invoices every customer's uninvoiced bookings in a date range at once.
+
+    One grouped query finds the customers and their totals, one INSERT adds all
+    the invoices and one UPDATE links the bookings, in a single transaction.
+
+    The bookings are locked first and those locked by a concurrent run are
+    skipped, so two runs can't invoice the same booking. Raises a ConflictError
+    (after rolling back) if the bookings changed before they could be linked.
+    """
+    lock_query = (
+        select(Booking.booking_id)
+        .where(
+            *get_invoice_booking_filters(date_start, date_end),
+            Booking.invoice_id.is_(None),
+        )
+        .with_for_update(skip_locked=True)
+    )
+    booking_ids = db.scalars(lock_query).all()
+    if not booking_ids:
+        db.rollback()
+        return []
+    booking_filters = [Booking.booking_id.in_(booking_ids)]
+    query = (
+        select(
+            Booking.customer_id,
+            Service.service_id,
+            Service.name,
+            Service.price,
+            func.count(Booking.booking_id),
+        )
+        .join(Service, Booking.service_id == Service.service_id)
+        .where(*booking_filters)
+        .group_by(Booking.customer_id, Service.service_id, Service.name, Service.price)
+        .order_by(Booking.customer_id)
+    )
+    breakdowns = {}
+    for customer_id, *line in db.execute(query):
+        breakdowns.setdefault(customer_id, []).append(_get_breakdown_line(*line))
+    if not breakdowns:
+        return []
+
+    date_issued = datetime.now()
+    invoices_data = []
+    for customer_id, breakdown in breakdowns.items():
+        price_subtotal = sum((line["total"] for line in breakdown), Decimal("0.00"))
+        price_discount = Decimal("0.00")
+        invoices_data.append(
+            {
+                "customer_id": customer_id,
+                "reference": get_invoice_reference(customer_id, date_start, date_end),
+                "date_start": date_start,
+                "date_end": date_end,
+                "date_issued": date_issued,
+                "date_due": date_issued + timedelta(days=INVOICE_DAYS_DUE),
+                "price_subtotal": float(price_subtotal),
+                "price_discount": float(price_discount),
+                "price_total": float(price_subtotal - price_discount),
+                "created_by": current_user.user_id,
+                "updated_by": current_user.user_id,
+            }
+        )
+
+    try:
+        invoice_ids = dict(
+            db.execute(
+                insert(Invoice).returning(Invoice.customer_id, Invoice.invoice_id),
+                invoices_data,
+            ).all()
+        )
+        # Each customer has exactly one new invoice, so it can be looked up by
+        # the booking's customer
+        new_invoice_id = (
+            select(Invoice.invoice_id)
+            .where(
+                Invoice.customer_id == Booking.customer_id,
+                Invoice.invoice_id.in_(invoice_ids.values()),
+            )
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(Booking)
+            .where(*booking_filters, Booking.invoice_id.is_(None))
+            .values(invoice_id=new_invoice_id),
+            execution_options={"synchronize_session": False},
+        )
+        # Every locked booking must be linked, or an invoice would be left
+        # without (some of) the bookings it charges for
+        is_linked = result.rowcount == len(booking_ids)
+        if is_linked:
+            db.commit()
+        else:
+            db.rollback()
+    except SQLAlchemyError as e:
+        detail = f"Error generating invoices: {e}"
+        logger.error(detail)
+        db.rollback()
+        raise DatabaseError("An error occurred while generating invoices.")
+    if not is_linked:
+        detail = "Bookings were invoiced while generating invoices, please try again"
+        logger.warning(detail)
+        raise ConflictError(detail)
+    invalidate_count_cache(Invoice.__tablename__, Booking.__tablename__)
+
+    return [
+        {
+            "customer_id": invoice_data["customer_id"],
+            "invoice_id": invoice_ids[invoice_data["customer_id"]],
+            "reference": invoice_data["reference"],
+            "booking_count": sum(
+                line["count"] for line in breakdowns[invoice_data["customer_id"]]
+            ),
+            "price_total": invoice_data["price_total"],
+        }
+        for invoice_data in invoices_data
+    ]
@@ -3,8 +3,10 @@ from typing import Optional
 
 import bcrypt
 from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
 
 from database import SessionLocal
+from exceptions import DatabaseError, NotFoundError
 from models import User
 
 
@@ -18,3 +20,25 @@ def get_users(db: SessionLocal, is_active: Optional[bool] = None) -> list[User]:
 
 def get_user_by_name(db: SessionLocal, name: str) -> Optional[User]:
     return db.query(User).filter_by(name=name).first()
+
+
+def get_user_by_id(db: SessionLocal, user_id: int) -> User:
+    user = db.get(User, user_id)
+    if not user:
+        raise NotFoundError(f"User {user_id} not found")
+    return user
+
+
+def rotate_calendar_token(db: SessionLocal, current_user: User, user_id: int) -> User:
+    user = get_user_by_id(db, user_id)
+    try:
+        user.calendar_token_version = User.calendar_token_version + 1
+        user.updated_by = current_user.user_id
+        db.commit()
+        db.refresh(user)
+        return user
+    except SQLAlchemyError as e:
+        detail = f"Error rotating calendar token: {e}"
+        logger.error(detail)
+        db.rollback()
+        raise DatabaseError("An error occurred while rotating the calendar token.")
@@ -1,16 +1,232 @@
+from collections import Counter
+from contextvars import ContextVar
 import os
+import threading
+import time
+from typing import Optional
 
-from sqlalchemy import create_engine
+from loguru import logger
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from config import settings
 
 SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
-if not SQLALCHEMY_DATABASE_URI:
-    message = f"SQLALCHEMY_DATABASE_URI not set, unable to make SessionLocal object."
-    logger.error(message)
-    raise ValueError(message)
+SQLALCHEMY_REPLICA_URI = os.getenv("SQLALCHEMY_REPLICA_URI")
+
+
+def get_pool_kwargs(is_async: bool = False) -> dict:
+    """Returns the engine pool arguments for the configured `DB_POOL_MODE`.
+
+    In "queue" mode `DB_POOL_SIZE` and `DB_MAX_OVERFLOW` are the budget for each
+    database (primary or replica), split between the sync pool and the async one,
+    which gets `DB_ASYNC_POOL_SIZE` and `DB_ASYNC_MAX_OVERFLOW` of it.
+    """
+    if settings.DB_POOL_MODE == "serverless":
+        return {"poolclass": NullPool}
+    if settings.DB_POOL_MODE != "queue":
+        raise ValueError(f"Unknown DB_POOL_MODE {settings.DB_POOL_MODE}")
+    # A pool_size of 0 would mean no limit, so the sync pool keeps at least one
+    if not 0 < settings.DB_ASYNC_POOL_SIZE < settings.DB_POOL_SIZE:
+        raise ValueError("DB_ASYNC_POOL_SIZE must be between 1 and DB_POOL_SIZE - 1")
+    if not 0 <= settings.DB_ASYNC_MAX_OVERFLOW <= settings.DB_MAX_OVERFLOW:
+        raise ValueError("DB_ASYNC_MAX_OVERFLOW must be between 0 and DB_MAX_OVERFLOW")
+    if is_async:
+        pool_size = settings.DB_ASYNC_POOL_SIZE
+        max_overflow = settings.DB_ASYNC_MAX_OVERFLOW
+    else:
+        pool_size = settings.DB_POOL_SIZE - settings.DB_ASYNC_POOL_SIZE
+        max_overflow = settings.DB_MAX_OVERFLOW - settings.DB_ASYNC_MAX_OVERFLOW
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_async_database_url(database_uri: str) -> tuple:
+    """Returns the async driver URL and connect args for a sync database URI."""
+    url = make_url(database_uri)
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes the SSL mode as a connect argument instead of a query string
+        sslmode = url.query.get("sslmode")
+        url = url.set(drivername="postgresql+asyncpg").difference_update_query(
+            ["sslmode"]
+        )
+        if sslmode:
+            connect_args["ssl"] = sslmode
+        if settings.DB_EXTERNAL_POOLER:
+            # Prepared statements don't survive transaction-mode poolers
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url, connect_args
+
+
+pool_metrics = {}
+_pool_metrics_lock = threading.Lock()
+_pool_metrics_engines = {}
+
+
+def _track_pool_metrics(engine, name: str):
+    metrics = {
+        "connections": 0,
+        "checkouts": 0,
+        "checkins": 0,
+        "checked_out": 0,
+        "max_checked_out": 0,
+        "invalidations": 0,
+    }
+    # Engines are created lazily, possibly while the metrics are being read
+    with _pool_metrics_lock:
+        pool_metrics[name] = metrics
+        _pool_metrics_engines[name] = engine
+
+    def on_connect(dbapi_connection, connection_record):
+        with _pool_metrics_lock:
+            metrics["connections"] += 1
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_metrics_lock:
+            metrics["checkouts"] += 1
+            metrics["checked_out"] += 1
+            metrics["max_checked_out"] = max(
+                metrics["max_checked_out"], metrics["checked_out"]
+            )
+
+    def on_checkin(dbapi_connection, connection_record):
+        with _pool_metrics_lock:
+            metrics["checkins"] += 1
+            metrics["checked_out"] -= 1
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with _pool_metrics_lock:
+            metrics["invalidations"] += 1
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "invalidate", on_invalidate)
+
+
+def get_pool_metrics() -> dict:
+    """Returns the checkout counters and pool status of each engine."""
+    with _pool_metrics_lock:
+        return {
+            name: {**metrics, "status": _pool_metrics_engines[name].pool.status()}
+            for name, metrics in pool_metrics.items()
+        }
+
+
+# Statement counts and timings of the current request, see `start_query_stats`
+_query_stats: ContextVar[Optional[dict]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> dict:
+    """Starts collecting the SQL statements run in the current context.
+
+    Returns the stats dict, which is filled in as statements run: the number of
+    statements, the total time spent in the database and a count per statement.
+    """
+    stats = {"count": 0, "duration": 0.0, "statements": Counter()}
+    _query_stats.set(stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is None or context is None:
+        return
+    stats["count"] += 1
+    stats["duration"] += time.perf_counter() - context._query_start_time
+    stats["statements"][statement] += 1
+
+
+def _track_query_stats(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _create_engine(database_uri: str, name: str):
+    engine = create_engine(database_uri, **get_pool_kwargs())
+    _track_pool_metrics(engine, name)
+    _track_query_stats(engine)
+    return engine
+
+
+def _create_async_engine(database_uri: str, name: str):
+    async_url, async_connect_args = get_async_database_url(database_uri)
+    engine = create_async_engine(
+        async_url, connect_args=async_connect_args, **get_pool_kwargs(is_async=True)
+    )
+    _track_pool_metrics(engine.sync_engine, f"{name}_async")
+    _track_query_stats(engine.sync_engine)
+    return engine
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _get_engine(read_only: bool, is_async: bool):
+    # Engines are created on first use so that importing the app (on every cold
+    # start) doesn't pay for building them or importing the database drivers,
+    # and so that a process only holds an async pool once it serves an async route
+    name = "replica" if read_only and SQLALCHEMY_REPLICA_URI else "primary"
+    key = (name, is_async)
+    if key not in _engines:
+        with _engines_lock:
+            if key not in _engines:
+                if name == "replica":
+                    database_uri = SQLALCHEMY_REPLICA_URI
+                elif SQLALCHEMY_DATABASE_URI:
+                    database_uri = SQLALCHEMY_DATABASE_URI
+                else:
+                    message = "SQLALCHEMY_DATABASE_URI not set, unable to make engine."
+                    logger.error(message)
+                    raise ValueError(message)
+                if is_async:
+                    _engines[key] = _create_async_engine(database_uri, name)
+                else:
+                    _engines[key] = _create_engine(database_uri, name)
+    return _engines[key]
+
+
+def get_engine(read_only: bool = False):
+    """Returns the sync engine, the replica's if `read_only` and one is configured."""
+    return _get_engine(read_only, is_async=False)
+
+
+def get_async_engine(read_only: bool = False):
+    """Returns the async engine, the replica's if `read_only` and one is configured."""
+    return _get_engine(read_only, is_async=True)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def get_session(read_only: bool = False):
+    """Returns a session bound to the replica for reads if one is configured."""
+    return SessionLocal(bind=get_engine(read_only))
+
+
+def get_async_session(read_only: bool = False):
+    """Returns an async session bound to the replica for reads if one is configured."""
+    return AsyncSessionLocal(bind=get_async_engine(read_only))
 
-engine = create_engine(SQLALCHEMY_DATABASE_URI)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,14 +1,15 @@
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 
-from fastapi import Depends, BackgroundTasks, Query, HTTPException, status
+from fastapi import Depends, BackgroundTasks, Query, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import jwt
 from jwt.exceptions import InvalidTokenError
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from cruds import user_crud
-from database import SessionLocal
+from cruds import async_user_crud, user_crud
+from database import SessionLocal, get_async_session, get_session
 from models import User
 from schemas.pagination_schema import PaginationParamsSchema
 from schemas.token_schema import TokenData
@@ -17,8 +18,16 @@ from schemas.token_schema import TokenData
 def get_pagination_params(
     page: int = Query(1, description="Page number"),
     page_size: int = Query(20, description="Number of items per page"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from X-Pagination to seek to a page"
+    ),
+    count: Literal["exact", "estimated", "none"] = Query(
+        "exact", description="How to count the total number of items"
+    ),
 ) -> PaginationParamsSchema:
-    return PaginationParamsSchema(page=page, page_size=page_size)
+    return PaginationParamsSchema(
+        page=page, page_size=page_size, cursor=cursor, count=count
+    )
 
 
 GetPaginationParamsDep = Annotated[
@@ -26,8 +35,11 @@ GetPaginationParamsDep = Annotated[
 ]
 
 
-def get_db():
-    db = SessionLocal()
+READ_ONLY_METHODS = {"GET", "HEAD"}
+
+
+def get_db(request: Request):
+    db = get_session(read_only=request.method in READ_ONLY_METHODS)
     try:
         yield db
     finally:
@@ -37,6 +49,14 @@ def get_db():
 GetDBDep = Annotated[SessionLocal, Depends(get_db)]
 
 
+async def get_async_db(request: Request):
+    async with get_async_session(read_only=request.method in READ_ONLY_METHODS) as db:
+        yield db
+
+
+GetAsyncDBDep = Annotated[AsyncSession, Depends(get_async_db)]
+
+
 def get_oauth2_form_data(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
@@ -51,7 +71,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", scopes=scopes)
 GetTokenDep = Annotated[str, Depends(oauth2_scheme)]
 
 
-async def get_current_user(db: GetDBDep, token: GetTokenDep):
+def _get_token_username(token: str) -> str:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -67,34 +87,79 @@ async def get_current_user(db: GetDBDep, token: GetTokenDep):
         token_data = TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
-    user = user_crud.get_user_by_name(db, token_data.username)
+    return token_data.username
+
+
+def _check_user(user: Optional[User]) -> User:
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
-GetCurrentUserDep = Annotated[User, Depends(get_current_user)]
+def _check_active_user(user: User) -> User:
+    if user.is_active:
+        return user
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+        )
 
 
-async def get_current_active_user(current_user: GetCurrentUserDep):
-    if current_user.is_active:
-        return current_user
+def _check_admin_user(user: User) -> User:
+    if user.is_admin:
+        return user
     else:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
         )
 
 
+# The user is looked up on the same session as the route uses (FastAPI shares a
+# dependency within a request), so that authenticated requests only ever hold one
+# connection. Routes on `GetAsyncDBDep` use the `GetAsync*UserDep` variants.
+async def get_current_user(db: GetDBDep, token: GetTokenDep):
+    username = _get_token_username(token)
+    return _check_user(user_crud.get_user_by_name(db, username))
+
+
+GetCurrentUserDep = Annotated[User, Depends(get_current_user)]
+
+
+async def get_current_active_user(current_user: GetCurrentUserDep):
+    return _check_active_user(current_user)
+
+
 GetCurrentActiveUserDep = Annotated[User, Depends(get_current_active_user)]
 
 
 async def get_current_admin_user(current_user: GetCurrentActiveUserDep):
-    if current_user.is_admin:
-        return current_user
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
-        )
+    return _check_admin_user(current_user)
 
 
 GetCurrentAdminUserDep = Annotated[User, Depends(get_current_admin_user)]
+
+
+async def get_async_current_user(db: GetAsyncDBDep, token: GetTokenDep):
+    username = _get_token_username(token)
+    return _check_user(await async_user_crud.get_user_by_name(db, username))
+
+
+GetAsyncCurrentUserDep = Annotated[User, Depends(get_async_current_user)]
+
+
+async def get_async_current_active_user(current_user: GetAsyncCurrentUserDep):
+    return _check_active_user(current_user)
+
+
+GetAsyncCurrentActiveUserDep = Annotated[User, Depends(get_async_current_active_user)]
+
+
+async def get_async_current_admin_user(current_user: GetAsyncCurrentActiveUserDep):
+    return _check_admin_user(current_user)
+
+
+GetAsyncCurrentAdminUserDep = Annotated[User, Depends(get_async_current_admin_user)]
@@ -4,3 +4,11 @@ class NotFoundError(Exception):
 
 class DatabaseError(Exception):
     pass
+
+
+class ConflictError(Exception):
+    pass
+
+
+class ServiceUnavailableError(Exception):
+    pass
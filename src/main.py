@@ -1,9 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 
 from config import settings
+from database import start_query_stats
 from routers import (
     auth_router,
     user_router,
@@ -15,6 +16,7 @@ from routers import (
     invoice_router,
     expense_router,
     # income_statement_router,
+    metrics_router,
 )
 
 logger.debug("Creating application ...")
@@ -47,12 +49,56 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allow_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "X-Pagination"],
     expose_headers=["Content-Disposition", "X-Pagination"],
 )
 
 
+def _warn_repeated_statements(request: Request, stats: dict):
+    for statement, count in stats["statements"].items():
+        if count > settings.SQL_REPEATED_STATEMENT_THRESHOLD:
+            logger.warning(
+                f"{request.method} {request.url.path} ran the same statement "
+                f"{count} times: {statement}"
+            )
+
+
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    """Reports the SQL statements run by each request in a Server-Timing header.
+
+    Logs a warning when one statement runs more times than
+    `SQL_REPEATED_STATEMENT_THRESHOLD`, which usually means an N+1 lazy load.
+
+    Streamed responses (without a Content-Length) run most of their queries while
+    the body is sent, after the headers have gone out, so they get no header and
+    their statements are only checked once the body is finished.
+    """
+    stats = start_query_stats()
+    response = await call_next(request)
+    is_streamed = "content-length" not in response.headers and (
+        response.status_code not in (204, 304)
+    )
+    if not is_streamed:
+        duration = stats["duration"] * 1000
+        response.headers["Server-Timing"] = (
+            f'db;dur={duration:.1f};desc="{stats["count"]} queries"'
+        )
+        _warn_repeated_statements(request, stats)
+        return response
+
+    body_iterator = response.body_iterator
+
+    async def warn_after_body():
+        async for chunk in body_iterator:
+            yield chunk
+        _warn_repeated_statements(request, stats)
+
+    response.body_iterator = warn_after_body()
+    return response
+
+
 logger.debug("Including routes ...")
 app.include_router(auth_router)
 app.include_router(user_router)
@@ -64,6 +110,7 @@ app.include_router(booking_router)
 app.include_router(invoice_router)
 app.include_router(expense_router)
 # app.include_router(income_statement_router)
+app.include_router(metrics_router)
 
 
 from routers import contact_us_router, customer_sign_up_router
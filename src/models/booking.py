@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Date, Time, ForeignKey, Integer
+from sqlalchemy import Boolean, Column, Date, Time, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -7,6 +7,12 @@ from models.timestamp_mixin import TimestampMixin
 
 class Booking(TimestampMixin, Base):
     __tablename__ = "booking"
+    __table_args__ = (
+        Index("ix_booking_user_id_date", "user_id", "date", "time"),
+        Index("ix_booking_customer_id_date", "customer_id", "date"),
+        Index("ix_booking_service_id_date", "service_id", "date"),
+        Index("ix_booking_date_time", "date", "time"),
+    )
 
     booking_id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -19,7 +25,9 @@ class Booking(TimestampMixin, Base):
     service_id = Column(Integer, ForeignKey("service.service_id"), nullable=False)
     service = relationship("Service", backref="booking")
 
-    invoice_id = Column(Integer, ForeignKey("invoice.invoice_id"), nullable=True)
+    invoice_id = Column(
+        Integer, ForeignKey("invoice.invoice_id"), nullable=True, index=True
+    )
 
     user_id = Column(Integer, ForeignKey("user.user_id"), nullable=True)
     user = relationship("User", backref="booking", foreign_keys=[user_id])
@@ -12,7 +12,7 @@ class Invoice(TimestampMixin, Base):
 
     date_start = Column(Date, nullable=False)
     date_end = Column(Date, nullable=False)
-    date_issued = Column(Date, nullable=False)
+    date_issued = Column(Date, nullable=False, index=True)
     date_due = Column(Date, nullable=True)
     date_paid = Column(Date, nullable=True)
 
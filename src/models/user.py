@@ -9,11 +9,15 @@ class User(TimestampMixin, Base):
     __tablename__ = "user"
 
     user_id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, index=True)
     email = Column(String)
     password_hash = Column(String)
     is_admin = Column(Boolean, default=False)
     is_active = Column(Boolean, default=False)
+    # Bumped to revoke the user's calendar feed URL
+    calendar_token_version = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     @property
     def username(self) -> str:
@@ -1,41 +1,303 @@
+import base64
+import binascii
 import json
-from typing import Annotated, Any
+import threading
+import time
+from typing import Annotated, Any, Optional
 
-from fastapi import Response
+from fastapi import HTTPException, Response, status
 from pydantic import BaseModel
+from sqlalchemy import and_, func, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.util import find_tables
 
+from config import settings
 from schemas.pagination_schema import PaginationParamsSchema
 
 
-def paginate(
-    query, pagination_params: PaginationParamsSchema, response: Response
-) -> dict[str, Any]:
-    offset = (pagination_params.page - 1) * pagination_params.page_size
-    paginated_query = query.offset(offset).limit(pagination_params.page_size)
-    items = paginated_query.all()
+def encode_cursor(values: list, direction: str = "next") -> str:
+    """Encodes the keyset values of a row into an opaque cursor string."""
+    payload = {
+        "values": [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in values
+        ],
+        "direction": direction,
+    }
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8"))
+    return cursor.decode("utf-8").rstrip("=")
 
-    # Get the total count of items that match the query criteria
-    total_items = query.offset(None).limit(None).count()
 
-    # Compute pagination parameters
-    total_pages = (
-        total_items + pagination_params.page_size - 1
-    ) // pagination_params.page_size
-    has_next = pagination_params.page < total_pages
-    has_prev = pagination_params.page > 1
-    next_page = pagination_params.page + 1 if has_next else None
-    prev_page = pagination_params.page - 1 if has_prev else None
+def decode_cursor(cursor: str) -> dict:
+    """Decodes an opaque cursor string back into its keyset values and direction."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    if (
+        not isinstance(payload, dict)
+        or not isinstance(payload.get("values"), list)
+        or payload.get("direction") not in ("next", "prev")
+    ):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return payload
+
+
+def _unpack_order_by(clause) -> tuple[Any, bool]:
+    # Split e.g. `Booking.date.desc()` into (Booking.date, True)
+    modifier = getattr(clause, "modifier", None)
+    if modifier in (operators.desc_op, operators.asc_op):
+        return clause.element, modifier is operators.desc_op
+    return clause, False
+
+
+def _parse_cursor_value(column, value):
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if hasattr(python_type, "fromisoformat"):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def _seek_filter(columns: list[tuple[Any, bool]], values: list, reverse: bool):
+    # (a, b, c) "after" (x, y, z) expands to
+    # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    # with the comparison flipped for descending columns.
+    clauses = []
+    for i, (column, descending) in enumerate(columns):
+        equalities = [columns[j][0] == values[j] for j in range(i)]
+        if descending != reverse:
+            comparison = column < values[i]
+        else:
+            comparison = column > values[i]
+        clauses.append(and_(*equalities, comparison))
+    return or_(*clauses)
+
+
+def _get_keyset_values(item, columns: list[tuple[Any, bool]]) -> list:
+    return [getattr(item, column.key) for column, _ in columns]
+
+
+def _paginate_keyset(
+    query, pagination_params: PaginationParamsSchema, keyset: tuple
+) -> tuple[list, dict[str, Any]]:
+    try:
+        cursor = decode_cursor(pagination_params.cursor)
+        columns = [_unpack_order_by(clause) for clause in keyset]
+        if len(cursor["values"]) != len(columns):
+            raise ValueError(f"Invalid cursor {pagination_params.cursor}")
+        values = [
+            _parse_cursor_value(column, value)
+            for (column, _), value in zip(columns, cursor["values"])
+        ]
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    reverse = cursor["direction"] == "prev"
+    seek_query = query.filter(_seek_filter(columns, values, reverse))
+    if reverse:
+        seek_query = seek_query.order_by(None).order_by(
+            *[
+                column.asc() if descending else column.desc()
+                for column, descending in columns
+            ]
+        )
+
+    # Fetch one extra row to find out whether there is another page
+    items = seek_query.limit(pagination_params.page_size + 1).all()
+    has_more = len(items) > pagination_params.page_size
+    items = items[: pagination_params.page_size]
+    if reverse:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, True
 
     pagination = {
-        "page": pagination_params.page,
+        "page": None,
         "page_size": pagination_params.page_size,
-        "total_items": total_items,
-        "total_pages": total_pages,
-        "has_next": has_next,
-        "has_prev": has_prev,
-        "next_page": next_page,
-        "prev_page": prev_page,
+        "has_next": has_next and len(items) > 0,
+        "has_prev": has_prev and len(items) > 0,
+        "next_page": None,
+        "prev_page": None,
     }
+    return items, pagination
+
+
+# Counts keyed by the compiled count query and its parameters, each entry holding
+# (expiry time, total, names of the tables the query reads).
+_count_cache: dict[tuple, tuple[float, int, frozenset[str]]] = {}
+_count_cache_lock = threading.Lock()
+
+
+def _get_count_cache_key(query) -> tuple:
+    statement = query.offset(None).limit(None).order_by(None).statement
+    compiled = statement.compile(dialect=query.session.get_bind().dialect)
+    params = tuple(sorted((key, repr(value)) for key, value in compiled.params.items()))
+    return str(compiled), params
+
+
+def _get_cached_count(key: tuple) -> Optional[int]:
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, total_items, _ = entry
+        if expires_at < time.monotonic():
+            del _count_cache[key]
+            return None
+        return total_items
+
+
+def _set_cached_count(key: tuple, query, total_items: int):
+    if settings.PAGINATION_COUNT_CACHE_TTL <= 0:
+        return
+    tables = frozenset(
+        table.name for table in find_tables(query.statement, check_columns=True)
+    )
+    expires_at = time.monotonic() + settings.PAGINATION_COUNT_CACHE_TTL
+    with _count_cache_lock:
+        if len(_count_cache) >= settings.PAGINATION_COUNT_CACHE_SIZE:
+            # Drop the entry closest to expiry to make room
+            del _count_cache[min(_count_cache, key=lambda k: _count_cache[k][0])]
+        _count_cache[key] = (expires_at, total_items, tables)
+
+
+def invalidate_count_cache(*table_names: str):
+    """Drops the cached totals of every query that reads from the given tables.
+
+    The cache lives in process memory, so writes made through another worker are
+    only picked up once `PAGINATION_COUNT_CACHE_TTL` has passed.
+    """
+    table_names = set(table_names)
+    with _count_cache_lock:
+        for key in [
+            key for key, entry in _count_cache.items() if entry[2] & table_names
+        ]:
+            del _count_cache[key]
+
+
+def _count_exact(query) -> int:
+    return query.offset(None).limit(None).order_by(None).count()
+
+
+def _count_estimated(query) -> int:
+    # Use the planner's row estimate on Postgres, which avoids scanning the rows
+    session = query.session
+    connection = session.connection()
+    if connection.dialect.name != "postgresql":
+        return _count_exact(query)
+    statement = query.offset(None).limit(None).order_by(None).statement
+    compiled = statement.compile(dialect=connection.dialect)
+    result = connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate(
+    query,
+    pagination_params: PaginationParamsSchema,
+    response: Response,
+    keyset: Optional[tuple] = None,
+) -> dict[str, Any]:
+    """Paginates a query and adds the pagination data to the response headers.
+
+    If `keyset` (the query's ORDER BY clauses, ending in a unique column) is given,
+    next/prev cursors are returned alongside the page numbers and a request with a
+    `cursor` seeks directly to the page instead of using OFFSET.
+
+    The total is counted according to `pagination_params.count`: "exact" counts in
+    the same statement as the page with a window function, "estimated" uses the
+    query planner's estimate and "none" skips counting altogether. Exact totals are
+    cached for `PAGINATION_COUNT_CACHE_TTL` seconds, until `invalidate_count_cache`
+    is called for one of the tables the query reads.
+    """
+    count = pagination_params.count
+    total_items = None
+    count_cache_key = None
+    if count == "exact":
+        count_cache_key = _get_count_cache_key(query)
+        total_items = _get_cached_count(count_cache_key)
+    if keyset and pagination_params.cursor:
+        items, pagination = _paginate_keyset(query, pagination_params, keyset)
+        # The seek filter hides the rows before the cursor from a window count
+        if count == "exact" and total_items is None:
+            total_items = _count_exact(query)
+            _set_cached_count(count_cache_key, query, total_items)
+    else:
+        offset = (pagination_params.page - 1) * pagination_params.page_size
+        paginated_query = query.offset(offset)
+        if count == "exact" and total_items is not None:
+            items = paginated_query.limit(pagination_params.page_size).all()
+        elif count == "exact":
+            rows = (
+                paginated_query.add_columns(func.count().over().label("total_items"))
+                .limit(pagination_params.page_size)
+                .all()
+            )
+            items = [row[0] for row in rows]
+            if rows:
+                total_items = rows[0].total_items
+            elif offset == 0:
+                total_items = 0
+            else:
+                # Past the last page there are no rows to carry the window count
+                total_items = _count_exact(query)
+            _set_cached_count(count_cache_key, query, total_items)
+        else:
+            # Fetch one extra row to find out whether there is another page
+            items = paginated_query.limit(pagination_params.page_size + 1).all()
+        pagination = {
+            "page": pagination_params.page,
+            "page_size": pagination_params.page_size,
+        }
+    if count == "estimated":
+        total_items = _count_estimated(query)
+
+    # Compute pagination parameters
+    if total_items is not None:
+        total_pages = (
+            total_items + pagination_params.page_size - 1
+        ) // pagination_params.page_size
+    else:
+        total_pages = None
+    if pagination["page"] is not None:
+        if count == "exact":
+            has_next = pagination_params.page < total_pages
+        else:
+            has_next = len(items) > pagination_params.page_size
+            items = items[: pagination_params.page_size]
+        has_prev = pagination_params.page > 1
+        next_page = pagination_params.page + 1 if has_next else None
+        prev_page = pagination_params.page - 1 if has_prev else None
+        pagination.update(
+            {
+                "has_next": has_next,
+                "has_prev": has_prev,
+                "next_page": next_page,
+                "prev_page": prev_page,
+            }
+        )
+    pagination["total_items"] = total_items
+    pagination["total_pages"] = total_pages
+
+    # Add cursors so that clients can switch to keyset pagination
+    next_cursor = None
+    prev_cursor = None
+    if keyset and items:
+        columns = [_unpack_order_by(clause) for clause in keyset]
+        if pagination["has_next"]:
+            next_cursor = encode_cursor(_get_keyset_values(items[-1], columns), "next")
+        if pagination["has_prev"]:
+            prev_cursor = encode_cursor(_get_keyset_values(items[0], columns), "prev")
+    pagination["next_cursor"] = next_cursor
+    pagination["prev_cursor"] = prev_cursor
 
     # Add pagination data to the headers
     response.headers["X-Pagination"] = json.dumps(pagination)
@@ -8,6 +8,7 @@ from routers.booking_router import booking_router
 from routers.invoice_router import invoice_router
 from routers.expense_router import expense_router
 from routers.income_statement_router import income_statement_router
+from routers.metrics_router import metrics_router
 
 from routers.contact_us_router import contact_us_router
 from routers.customer_sign_up_router import customer_sign_up_router
@@ -1,38 +1,333 @@
-from typing import Optional
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
-from cruds import booking_crud
+from cruds import booking_crud, user_crud
+from database import get_session
 from dependencies import (
     GetDBDep,
     GetCurrentUserDep,
+    GetCurrentActiveUserDep,
     GetCurrentAdminUserDep,
     GetPaginationParamsDep,
 )
-from exceptions import DatabaseError, NotFoundError
+from exceptions import ConflictError, DatabaseError, NotFoundError
+from models import Booking, User
 from schemas.booking_schema import (
     BookingSnippetSchema,
     BookingSchema,
     BookingUpdateSchema,
     BookingCreateSchema,
+    BookingBulkCreateSchema,
+    BookingRecurringCreateSchema,
+    BookingAvailabilitySchema,
+    BookingCalendarSchema,
+    BookingScheduleSchema,
+    BookingBulkUpdateSchema,
+    BookingBulkDeleteSchema,
+    BookingBulkResultSchema,
+    BookingStatsSchema,
 )
+from services import auth_service, calendar_service, export_service
+from services.booking_availability_service import MAXIMUM_AVAILABILITY_DAYS
 
 booking_router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
+# Date ranges are half-open: from date_min up to, but not including, date_max
+DATE_MIN_DESCRIPTION = "First day of the date range (inclusive)."
+DATE_MAX_DESCRIPTION = "Day after the last day of the date range (exclusive)."
+
+
+TIME_CHOICES_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+
+@lru_cache(maxsize=1)
+def _get_time_choices_body() -> tuple[bytes, str]:
+    # The grid never changes while the app runs, so neither do its body and ETag
+    body = json.dumps(booking_crud.get_booking_time_choices()).encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return body, etag
+
 
 @booking_router.get("/time_choices", response_model=list[tuple[str, str]])
-async def read_booking_time_choices(db: GetDBDep) -> list[tuple[str, str]]:
+async def read_booking_time_choices(request: Request) -> Response:
     """Returns all available booking times."""
+    body, etag = _get_time_choices_body()
+    headers = {"ETag": etag, "Cache-Control": TIME_CHOICES_CACHE_CONTROL}
+    if_none_match = request.headers.get("If-None-Match", "")
+    if (
+        etag in (tag.strip() for tag in if_none_match.split(","))
+        or if_none_match == "*"
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@booking_router.get("/free_slots", response_model=dict[date, list[tuple[str, str]]])
+async def read_free_booking_slots(
+    db: GetDBDep,
+    current_user: GetCurrentUserDep,
+    user_id: int,
+    date_min: datetime = Query(description=DATE_MIN_DESCRIPTION),
+    date_max: datetime = Query(description=DATE_MAX_DESCRIPTION),
+    service_id: Optional[int] = None,
+) -> dict[date, list[tuple[str, str]]]:
+    """Returns the booking times a walker is free for on each day of a date range."""
+    number_of_days = (date_max.date() - date_min.date()).days
+    if not 0 < number_of_days <= MAXIMUM_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The date range must span 1 to {MAXIMUM_AVAILABILITY_DAYS} days",
+        )
+    try:
+        free_slots = booking_crud.get_free_booking_slots(
+            db, user_id, date_min, date_max, service_id
+        )
+        return free_slots
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@booking_router.get("/availability", response_model=BookingAvailabilitySchema)
+async def read_booking_availability(
+    db: GetDBDep,
+    current_user: GetCurrentUserDep,
+    user_id: int,
+    date_min: datetime = Query(description=DATE_MIN_DESCRIPTION),
+    date_max: datetime = Query(description=DATE_MAX_DESCRIPTION),
+    service_id: Optional[int] = None,
+) -> BookingAvailabilitySchema:
+    """Returns a walker's free booking times for each day as a bitmap string."""
+    number_of_days = (date_max.date() - date_min.date()).days
+    if not 0 < number_of_days <= MAXIMUM_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The date range must span 1 to {MAXIMUM_AVAILABILITY_DAYS} days",
+        )
+    try:
+        availability = booking_crud.get_booking_availability(
+            db, user_id, date_min, date_max, service_id
+        )
+        return availability
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@booking_router.get("/schedule", response_model=BookingScheduleSchema)
+async def read_booking_schedule(
+    db: GetDBDep,
+    current_user: GetCurrentUserDep,
+    schedule_date: datetime = Query(
+        alias="date", description="Day of the schedule, e.g. 2024-05-01."
+    ),
+) -> BookingScheduleSchema:
+    """Returns every walker's bookings for a day, grouped by walker."""
+    try:
+        schedule = booking_crud.get_booking_schedule(db, schedule_date.date())
+        return schedule
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+# How far back the calendar feed goes
+CALENDAR_HISTORY_DAYS = 30
+CALENDAR_BATCH_SIZE = 200
+
+
+def _stream_booking_calendar(user_id: int, date_min: date):
+    # The request's session may be closed before the body is sent, so the
+    # generator opens (and closes) its own
+    db = get_session(read_only=True)
+    try:
+        bookings = booking_crud.get_bookings(
+            db,
+            user_id=user_id,
+            date_min=date_min,
+            order_by=(Booking.date.asc(), Booking.time.asc()),
+            schema=BookingSnippetSchema,
+            yield_per=CALENDAR_BATCH_SIZE,
+        )
+        yield from calendar_service.stream_calendar("W4lkies bookings", bookings)
+    finally:
+        db.close()
+
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    # If-Modified-Since is ignored: deleting a booking doesn't move the latest
+    # updated_at (the Last-Modified), only the count in the ETag
+    if if_none_match := request.headers.get("If-None-Match"):
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in tags or "*" in tags
+    return False
+
+
+def _get_calendar_url(request: Request, user) -> dict:
+    url = request.url_for("read_booking_calendar", user_id=user.user_id)
+    token = auth_service.create_calendar_token(user)
+    return {"url": str(url.include_query_params(token=token))}
+
+
+@booking_router.get("/calendar/{user_id}/url", response_model=BookingCalendarSchema)
+async def read_booking_calendar_url(
+    db: GetDBDep, request: Request, current_user: GetCurrentActiveUserDep, user_id: int
+) -> BookingCalendarSchema:
+    """Returns the URL of a walker's calendar feed for subscribing to."""
+    if user_id != current_user.user_id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
+        )
+    try:
+        user = user_crud.get_user_by_id(db, user_id)
+        return _get_calendar_url(request, user)
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@booking_router.post("/calendar/{user_id}/url", response_model=BookingCalendarSchema)
+async def rotate_booking_calendar_url(
+    db: GetDBDep, request: Request, current_user: GetCurrentActiveUserDep, user_id: int
+) -> BookingCalendarSchema:
+    """Revokes a walker's calendar feed URL and returns a new one."""
+    if user_id != current_user.user_id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions"
+        )
+    try:
+        user = user_crud.rotate_calendar_token(db, current_user, user_id)
+        return _get_calendar_url(request, user)
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@booking_router.get("/calendar/{user_id}.ics")
+async def read_booking_calendar(
+    db: GetDBDep, request: Request, user_id: int, token: str
+) -> StreamingResponse:
+    """Streams a walker's bookings as an iCalendar feed."""
+    # Unknown and inactive walkers are rejected like a wrong token
+    user = db.get(User, user_id)
+    if not auth_service.verify_calendar_token(user, token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid calendar token"
+        )
+    date_min = datetime.now().date() - timedelta(days=CALENDAR_HISTORY_DAYS)
+    try:
+        updated_at, count = booking_crud.get_booking_calendar_version(
+            db, user_id, date_min
+        )
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    updated_at = (updated_at or datetime(1970, 1, 1)).replace(
+        microsecond=0, tzinfo=timezone.utc
+    )
+    # A deleted booking doesn't move the latest updated_at, but does the count
+    etag = f'W/"{user_id}-{int(updated_at.timestamp())}-{count}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return StreamingResponse(
+        _stream_booking_calendar(user_id, date_min),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
+
+
+@booking_router.get("/stats", response_model=BookingStatsSchema)
+async def read_booking_stats(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    date_min: Optional[datetime] = Query(None, description=DATE_MIN_DESCRIPTION),
+    date_max: Optional[datetime] = Query(None, description=DATE_MAX_DESCRIPTION),
+    user_id: Optional[int] = None,
+) -> BookingStatsSchema:
+    """Returns booking counts grouped by day, week, hour, walker and service."""
     try:
-        time_choices = booking_crud.get_booking_time_choices(db)
-        return time_choices
+        stats = booking_crud.get_booking_stats(
+            db,
+            date_min=date_min.date() if date_min else None,
+            date_max=date_max.date() if date_max else None,
+            user_id=user_id,
+        )
+        return stats
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_STREAMS = {
+    "csv": export_service.stream_csv,
+    "ndjson": export_service.stream_ndjson,
+}
+
+
+def _stream_booking_export(
+    export_format: str, date_min: Optional[date], date_max: Optional[date]
+):
+    # The request's session may be closed before the body is sent, so the
+    # generator opens (and closes) its own
+    db = get_session(read_only=True)
+    try:
+        header = [column.key for column in booking_crud.BOOKING_EXPORT_COLUMNS]
+        rows = booking_crud.get_booking_export_rows(db, date_min, date_max)
+        yield from EXPORT_STREAMS[export_format](header, rows)
+    finally:
+        db.close()
+
+
+@booking_router.get("/export")
+async def export_bookings(
+    current_user: GetCurrentAdminUserDep,
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    date_min: Optional[datetime] = Query(None, description=DATE_MIN_DESCRIPTION),
+    date_max: Optional[datetime] = Query(None, description=DATE_MAX_DESCRIPTION),
+) -> StreamingResponse:
+    """Streams all bookings in a date range as CSV or newline-delimited JSON."""
+    date_min = date_min.date() if date_min else None
+    date_max = date_max.date() if date_max else None
+    filename = "_".join(
+        ["bookings", *(str(value) for value in (date_min, date_max) if value)]
+    )
+    return StreamingResponse(
+        _stream_booking_export(export_format, date_min, date_max),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}.{export_format}"
+        },
+    )
+
+
 @booking_router.get("/upcoming", response_model=list[BookingSnippetSchema])
 async def read_upcoming_bookings(
     db: GetDBDep,
@@ -54,6 +349,7 @@ async def read_upcoming_bookings(
             response=response,
             user_id=user_id,
             customer_id=customer_id,
+            schema=BookingSnippetSchema,
         )
         return bookings
     except DatabaseError as e:
@@ -83,6 +379,7 @@ async def read_historic_bookings(
             response=response,
             user_id=user_id,
             customer_id=customer_id,
+            schema=BookingSnippetSchema,
         )
         return bookings
     except DatabaseError as e:
@@ -102,7 +399,10 @@ async def read_bookings(
     try:
         if current_user.is_admin:
             bookings = booking_crud.get_bookings(
-                db, pagination_params=pagination_params, response=response
+                db,
+                pagination_params=pagination_params,
+                response=response,
+                schema=BookingSchema,
             )
         else:
             bookings = booking_crud.get_bookings(
@@ -110,6 +410,7 @@ async def read_bookings(
                 pagination_params=pagination_params,
                 response=response,
                 user_id=current_user.user_id,
+                schema=BookingSchema,
             )
         return bookings
     except DatabaseError as e:
@@ -118,6 +419,54 @@ async def read_bookings(
         )
 
 
+@booking_router.patch("/bulk", response_model=list[BookingBulkResultSchema])
+async def update_bookings(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    booking_data: BookingBulkUpdateSchema,
+) -> list[BookingBulkResultSchema]:
+    """Applies the same changes to several bookings in a single statement."""
+    try:
+        bookings = booking_crud.update_bookings(db, current_user, booking_data)
+        return bookings
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}",
+        )
+
+
+@booking_router.delete("/bulk", response_model=list[BookingBulkResultSchema])
+async def delete_bookings(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    booking_data: BookingBulkDeleteSchema,
+) -> list[BookingBulkResultSchema]:
+    """Deletes several bookings in a single statement."""
+    try:
+        bookings = booking_crud.delete_bookings(db, booking_data.booking_ids)
+        return bookings
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}",
+        )
+
+
 @booking_router.get("/{booking_id}", response_model=BookingSchema)
 async def read_booking(
     db: GetDBDep, current_user: GetCurrentUserDep, booking_id: int
@@ -150,6 +499,8 @@ async def update_booking(
         return booking
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
@@ -191,6 +542,58 @@ async def create_booking(
     try:
         booking = booking_crud.add_booking(db, current_user, booking_data)
         return booking
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}",
+        )
+
+
+@booking_router.post("/bulk", response_model=list[BookingSnippetSchema])
+async def create_bookings(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    bookings_data: BookingBulkCreateSchema,
+) -> list[BookingSnippetSchema]:
+    """Creates bookings to add to the database in a single transaction."""
+    try:
+        bookings = booking_crud.add_bookings(db, current_user, bookings_data.bookings)
+        return bookings
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}",
+        )
+
+
+@booking_router.post("/recurring", response_model=list[BookingSnippetSchema])
+async def create_recurring_bookings(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    recurring_data: BookingRecurringCreateSchema,
+) -> list[BookingSnippetSchema]:
+    """Creates a booking on the given weekdays of every week in a date range."""
+    try:
+        bookings = booking_crud.add_recurring_bookings(db, current_user, recurring_data)
+        return bookings
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
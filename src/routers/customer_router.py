@@ -3,8 +3,13 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, status
 from loguru import logger
 
-from cruds import customer_crud
-from dependencies import GetDBDep, GetCurrentAdminUserDep
+from cruds import async_customer_crud, customer_crud
+from dependencies import (
+    GetAsyncDBDep,
+    GetAsyncCurrentAdminUserDep,
+    GetDBDep,
+    GetCurrentAdminUserDep,
+)
 from exceptions import DatabaseError, NotFoundError
 from schemas.customer_schema import (
     CustomerSchema,
@@ -17,15 +22,15 @@ customer_router = APIRouter(prefix="/customers", tags=["Customers"])
 
 @customer_router.get("/", response_model=list[CustomerSchema])
 async def read_customers(
-    db: GetDBDep,
-    current_user: GetCurrentAdminUserDep,
+    db: GetAsyncDBDep,
+    current_user: GetAsyncCurrentAdminUserDep,
     is_active: Optional[bool] = Query(
         None, description="Filter customers by their active status. Defaults to None."
     ),
 ) -> list[CustomerSchema]:
     """Reads and returns all customers from the database."""
     try:
-        customers = customer_crud.get_customers(db, is_active=is_active)
+        customers = await async_customer_crud.get_customers(db, is_active=is_active)
         return customers
     except DatabaseError as e:
         raise HTTPException(
@@ -35,11 +40,11 @@ async def read_customers(
 
 @customer_router.get("/{customer_id}", response_model=CustomerSchema)
 async def read_customer(
-    db: GetDBDep, current_user: GetCurrentAdminUserDep, customer_id: int
+    db: GetAsyncDBDep, current_user: GetAsyncCurrentAdminUserDep, customer_id: int
 ) -> CustomerSchema:
     """Reads and returns a specific customer from the database."""
     try:
-        customer = customer_crud.get_customer_by_id(db, customer_id)
+        customer = await async_customer_crud.get_customer_by_id(db, customer_id)
         return customer
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, status
 from loguru import logger
 
-from cruds import dog_crud
-from dependencies import GetDBDep, GetCurrentAdminUserDep
+from cruds import async_dog_crud, dog_crud
+from dependencies import GetAsyncDBDep, GetDBDep, GetCurrentAdminUserDep
 from exceptions import DatabaseError, NotFoundError
 from schemas.dog_schema import DogSchema, DogUpdateSchema, DogCreateSchema
 
@@ -10,10 +10,10 @@ dog_router = APIRouter(prefix="/dogs", tags=["Dogs"])
 
 
 @dog_router.get("/breeds", response_model=list[str])
-async def read_dog_breeds(db: GetDBDep) -> list[str]:
+async def read_dog_breeds(db: GetAsyncDBDep) -> list[str]:
     """Reads and returns all dog breeds from the database."""
     try:
-        dogs = dog_crud.get_dog_breeds(db)
+        dogs = await async_dog_crud.get_dog_breeds(db)
         return dogs
     except DatabaseError as e:
         raise HTTPException(
@@ -22,10 +22,10 @@ async def read_dog_breeds(db: GetDBDep) -> list[str]:
 
 
 @dog_router.get("/", response_model=list[DogSchema])
-async def read_dogs(db: GetDBDep) -> list[DogSchema]:
+async def read_dogs(db: GetAsyncDBDep) -> list[DogSchema]:
     """Reads and returns all dogs from the database."""
     try:
-        dogs = dog_crud.get_dogs(db)
+        dogs = await async_dog_crud.get_dogs(db)
         return dogs
     except DatabaseError as e:
         raise HTTPException(
@@ -1,18 +1,28 @@
 import io
-from typing import Annotated, Union
+from datetime import datetime
+from typing import Annotated, Optional, Union
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from fastapi.responses import FileResponse, StreamingResponse
 from loguru import logger
 
+from config import settings
 from cruds import invoice_crud
-from dependencies import GetDBDep, GetCurrentAdminUserDep
-from exceptions import DatabaseError, NotFoundError
+from dependencies import GetDBDep, GetCurrentAdminUserDep, GetPaginationParamsDep
+from exceptions import (
+    ConflictError,
+    DatabaseError,
+    NotFoundError,
+    ServiceUnavailableError,
+)
 from schemas.invoice_schema import (
     InvoiceBaseSchema,
     InvoiceSchema,
     InvoiceGenerateSchema,
+    InvoiceBatchGenerateSchema,
+    InvoiceBatchResultSchema,
 )
+from services import render_pool_service
 
 invoice_router = APIRouter(prefix="/invoices", tags=["Invoices"])
 
@@ -20,11 +30,33 @@ invoice_router = APIRouter(prefix="/invoices", tags=["Invoices"])
 @invoice_router.get("/", response_model=list[InvoiceSchema])
 async def read_invoices(
     db: GetDBDep,
+    pagination_params: GetPaginationParamsDep,
+    response: Response,
     # current_user: GetCurrentAdminUserDep,
+    customer_id: Optional[int] = Query(
+        None, description="Filter invoices by customer. Defaults to None."
+    ),
+    is_paid: Optional[bool] = Query(
+        None, description="Filter paid or unpaid invoices. Defaults to None."
+    ),
+    date_min: Optional[datetime] = Query(
+        None, description="Filter invoices issued on or after a date."
+    ),
+    date_max: Optional[datetime] = Query(
+        None, description="Filter invoices issued on or before a date."
+    ),
 ) -> list[InvoiceSchema]:
     """Reads and returns all invoices from the database."""
     try:
-        invoices = invoice_crud.get_invoices(db)
+        invoices = invoice_crud.get_invoices(
+            db,
+            pagination_params=pagination_params,
+            response=response,
+            customer_id=customer_id,
+            is_paid=is_paid,
+            date_min=date_min.date() if date_min else None,
+            date_max=date_max.date() if date_max else None,
+        )
         return invoices
     except DatabaseError as e:
         raise HTTPException(
@@ -79,27 +111,69 @@ async def generate_invoice(
         )
 
 
+@invoice_router.post("/generate_batch", response_model=list[InvoiceBatchResultSchema])
+async def generate_invoices(
+    db: GetDBDep,
+    current_user: GetCurrentAdminUserDep,
+    data: InvoiceBatchGenerateSchema,
+) -> list[InvoiceBatchResultSchema]:
+    """Generates an invoice for each customer with uninvoiced bookings in a range."""
+    try:
+        invoices = invoice_crud.generate_invoices(
+            db, current_user, data.date_start, data.date_end
+        )
+        return invoices
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
 @invoice_router.get("/{invoice_id}/download")
 async def download_invoice(
     db: GetDBDep,
+    request: Request,
     invoice_id: int
     # db: GetDBDep, current_user: GetCurrentAdminUserDep, invoice_id: int
 ):
     """Downloads a specific invoice from the database."""
     try:
-        invoice_pdf, invoice_filename = invoice_crud.download_invoice_by_id(
-            db, invoice_id
-        )
+        render_inputs = invoice_crud.get_invoice_render_inputs(db, invoice_id)
+        # The PDF is identified by a hash of everything it is rendered from
+        etag = f'"{render_inputs.key}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cached = invoice_crud.get_cached_invoice_pdf(render_inputs)
+        if cached is not None:
+            invoice_pdf, invoice_filename = cached
+        else:
+            # Render off the event loop so other requests keep being served
+            invoice_pdf, invoice_filename = await render_pool_service.run(
+                invoice_crud.render_invoice_pdf, render_inputs
+            )
         return StreamingResponse(
             invoice_pdf,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={invoice_filename}"},
+            headers={
+                **headers,
+                "Content-Disposition": f"attachment; filename={invoice_filename}",
+            },
         )
         # return FileResponse(
         #     invoice_pdf, filename=invoice_filename, media_type="application/pdf"
         # )
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.INVOICE_RENDER_RETRY_AFTER)},
+        )
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from loguru import logger
+
+from database import get_pool_metrics
+from dependencies import GetCurrentAdminUserDep
+from services import render_pool_service
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@metrics_router.get("/")
+async def read_metrics(current_user: GetCurrentAdminUserDep) -> dict:
+    """Returns the runtime metrics of this worker."""
+    return {
+        "database": get_pool_metrics(),
+        "invoice_render_pool": render_pool_service.get_metrics(),
+    }
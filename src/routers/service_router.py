@@ -3,8 +3,8 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, status
 from loguru import logger
 
-from cruds import service_crud
-from dependencies import GetDBDep, GetCurrentAdminUserDep
+from cruds import async_service_crud, service_crud
+from dependencies import GetAsyncDBDep, GetDBDep, GetCurrentAdminUserDep
 from exceptions import DatabaseError, NotFoundError
 from schemas.service_schema import (
     ServiceSchema,
@@ -17,7 +17,7 @@ service_router = APIRouter(prefix="/services", tags=["Services"])
 
 @service_router.get("/", response_model=list[ServiceSchema])
 async def read_services(
-    db: GetDBDep,
+    db: GetAsyncDBDep,
     is_active: Optional[bool] = Query(
         None, description="Filter services by their active status. Defaults to None."
     ),
@@ -28,7 +28,7 @@ async def read_services(
 ) -> list[ServiceSchema]:
     """Reads and returns all services from the database."""
     try:
-        services = service_crud.get_services(
+        services = await async_service_crud.get_services(
             db, is_active=is_active, is_publicly_offered=is_publicly_offered
         )
         return services
@@ -39,10 +39,10 @@ async def read_services(
 
 
 @service_router.get("/{service_id}", response_model=ServiceSchema)
-async def read_service(db: GetDBDep, service_id: int) -> ServiceSchema:
+async def read_service(db: GetAsyncDBDep, service_id: int) -> ServiceSchema:
     """Reads and returns a specific service from the database."""
     try:
-        service = service_crud.get_service_by_id(db, service_id)
+        service = await async_service_crud.get_service_by_id(db, service_id)
         return service
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
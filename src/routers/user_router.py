@@ -3,8 +3,14 @@ from typing import Annotated, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Query
 from loguru import logger
 
-from cruds import user_crud
-from dependencies import GetDBDep, GetCurrentUserDep, GetCurrentAdminUserDep
+from cruds import async_user_crud
+from dependencies import (
+    GetAsyncDBDep,
+    GetAsyncCurrentAdminUserDep,
+    GetDBDep,
+    GetCurrentUserDep,
+    GetCurrentAdminUserDep,
+)
 from exceptions import DatabaseError
 from schemas.user_schema import UserSchema
 
@@ -14,15 +20,15 @@ user_router = APIRouter(prefix="/users", tags=["Users"])
 
 @user_router.get("/", response_model=list[UserSchema])
 async def read_users(
-    db: GetDBDep,
-    current_user: GetCurrentAdminUserDep,
+    db: GetAsyncDBDep,
+    current_user: GetAsyncCurrentAdminUserDep,
     is_active: Optional[bool] = Query(
         None, description="Filter users by their active status. Defaults to None."
     ),
 ) -> list[UserSchema]:
     """Reads and returns all users from the database."""
     try:
-        users = user_crud.get_users(db, is_active=is_active)
+        users = await async_user_crud.get_users(db, is_active=is_active)
         return users
     except DatabaseError as e:
         raise HTTPException(
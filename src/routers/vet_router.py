@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, status
 from loguru import logger
 
-from cruds import vet_crud
-from dependencies import GetDBDep, GetCurrentAdminUserDep
+from cruds import async_vet_crud, vet_crud
+from dependencies import GetAsyncDBDep, GetDBDep, GetCurrentAdminUserDep
 from exceptions import DatabaseError, NotFoundError
 from schemas.vet_schema import VetSchema, VetUpdateSchema, VetCreateSchema
 
@@ -10,10 +10,10 @@ vet_router = APIRouter(prefix="/vets", tags=["Vets"])
 
 
 @vet_router.get("/", response_model=list[VetSchema])
-async def read_vets(db: GetDBDep) -> list[VetSchema]:
+async def read_vets(db: GetAsyncDBDep) -> list[VetSchema]:
     """Reads and returns all vets from the database."""
     try:
-        vets = vet_crud.get_vets(db)
+        vets = await async_vet_crud.get_vets(db)
         return vets
     except DatabaseError as e:
         raise HTTPException(
@@ -22,10 +22,10 @@ async def read_vets(db: GetDBDep) -> list[VetSchema]:
 
 
 @vet_router.get("/{vet_id}", response_model=VetSchema)
-async def read_vet(db: GetDBDep, vet_id: int) -> VetSchema:
+async def read_vet(db: GetAsyncDBDep, vet_id: int) -> VetSchema:
     """Reads and returns a specific vet from the database."""
     try:
-        vet = vet_crud.get_vet_by_id(db, vet_id)
+        vet = await async_vet_crud.get_vet_by_id(db, vet_id)
         return vet
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
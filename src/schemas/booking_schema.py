@@ -1,7 +1,8 @@
-from typing import List, Optional, Union
-from datetime import datetime, time
+from typing import Annotated, List, Optional, Union
+from datetime import date, datetime, time, timedelta
+from datetime import time as time_of_day
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 from schemas.customer_schema import CustomerSchema, CustomerSnippetSchema
 from schemas.service_schema import ServiceSchema, ServiceSnippetSchema
@@ -33,6 +34,88 @@ class BookingCreateSchema(BaseModel):
     user_id: int
 
 
+MAXIMUM_BULK_BOOKINGS = 1000
+
+
+class BookingBulkCreateSchema(BaseModel):
+    bookings: list[BookingCreateSchema] = Field(
+        min_length=1, max_length=MAXIMUM_BULK_BOOKINGS
+    )
+
+
+class BookingRecurringCreateSchema(BaseModel):
+    # Days of the week to book, Monday is 0 and Sunday is 6
+    weekdays: list[Annotated[int, Field(ge=0, le=6)]] = Field(min_length=1)
+    time: time
+    customer_id: int
+    service_id: int
+    user_id: int
+    date_start: datetime
+    # Inclusive
+    date_end: datetime
+
+    @model_validator(mode="after")
+    def check_date_range(self):
+        if self.date_end < self.date_start:
+            raise ValueError("date_end must not be before date_start")
+        if self.date_end - self.date_start > timedelta(days=366):
+            raise ValueError("A recurring booking can span at most a year")
+        return self
+
+
+class BookingAvailabilitySchema(BaseModel):
+    # Start time of each slot, in the order of the characters in `days`
+    time_choices: list[str]
+    # "1" where the slot is free and "0" where it is taken, per day
+    days: dict[date, str]
+
+
+class BookingCalendarSchema(BaseModel):
+    url: str
+
+
+class BookingScheduleDogSchema(BaseModel):
+    dog_id: int
+    name: str
+    breed: Optional[str] = None
+    is_allowed_treats: bool
+    is_allowed_off_the_lead: bool
+    behavioral_issues: str = ""
+    medical_needs: str = ""
+
+
+class BookingScheduleCustomerSchema(BaseModel):
+    customer_id: int
+    name: str
+    phone: Optional[str] = None
+    dogs: list[BookingScheduleDogSchema]
+
+
+class BookingScheduleServiceSchema(BaseModel):
+    service_id: int
+    name: str
+    duration: Optional[float] = None
+
+
+class BookingScheduleItemSchema(BaseModel):
+    booking_id: int
+    time: time
+    customer: BookingScheduleCustomerSchema
+    service: BookingScheduleServiceSchema
+
+
+class BookingScheduleWalkerSchema(BaseModel):
+    # None for the bookings that have no walker yet
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    bookings: list[BookingScheduleItemSchema]
+
+
+class BookingScheduleSchema(BaseModel):
+    date: date
+    walkers: list[BookingScheduleWalkerSchema]
+
+
 class BookingUpdateSchema(BaseModel):
     date: Union[datetime, None] = None
     time: Union[time, None] = None
@@ -41,6 +124,77 @@ class BookingUpdateSchema(BaseModel):
     user_id: Union[int, None] = None
 
 
+class BookingBulkUpdateSchema(BaseModel):
+    booking_ids: list[int] = Field(min_length=1, max_length=MAXIMUM_BULK_BOOKINGS)
+    date: Optional[datetime] = None
+    time: Optional[time_of_day] = None
+    customer_id: Optional[int] = None
+    service_id: Optional[int] = None
+    user_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_changes(self):
+        if not self.model_dump(exclude={"booking_ids"}, exclude_none=True):
+            raise ValueError("At least one field to change must be given")
+        return self
+
+
+class BookingBulkDeleteSchema(BaseModel):
+    booking_ids: list[int] = Field(min_length=1, max_length=MAXIMUM_BULK_BOOKINGS)
+
+
+class BookingBulkResultSchema(BaseModel):
+    booking_id: int
+    date: date
+    time: time
+    customer_id: int
+    service_id: int
+    user_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BookingDayCountSchema(BaseModel):
+    date: date
+    count: int
+
+
+class BookingWeekCountSchema(BaseModel):
+    # ISO year and week number
+    year: int
+    week: int
+    count: int
+
+
+class BookingWeekdayHourCountSchema(BaseModel):
+    # Monday is 0 and Sunday is 6
+    weekday: int
+    hour: int
+    count: int
+
+
+class BookingWalkerCountSchema(BaseModel):
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    count: int
+
+
+class BookingServiceCountSchema(BaseModel):
+    service_id: int
+    name: str
+    count: int
+
+
+class BookingStatsSchema(BaseModel):
+    total: int
+    by_day: list[BookingDayCountSchema]
+    by_iso_week: list[BookingWeekCountSchema]
+    by_weekday_hour: list[BookingWeekdayHourCountSchema]
+    by_walker: list[BookingWalkerCountSchema]
+    by_service: list[BookingServiceCountSchema]
+
+
 class BookingSchema(BookingBaseSchema):
     booking_id: int
 
@@ -1,7 +1,7 @@
 from typing import List, Optional, Union
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from schemas.booking_schema import BookingBaseSchema, BookingSnippetSchema
 from schemas.customer_schema import (
@@ -43,6 +43,26 @@ class InvoiceGenerateSchema(BaseModel):
     customer_id: int
 
 
+class InvoiceBatchGenerateSchema(BaseModel):
+    date_start: datetime
+    # Exclusive
+    date_end: datetime
+
+    @model_validator(mode="after")
+    def check_date_range(self):
+        if self.date_end <= self.date_start:
+            raise ValueError("date_end must be after date_start")
+        return self
+
+
+class InvoiceBatchResultSchema(BaseModel):
+    customer_id: int
+    invoice_id: int
+    reference: str
+    booking_count: int
+    price_total: float
+
+
 class InvoiceUpdateSchema(BaseModel):
     name: Union[str, None] = None
     price: Union[float, None] = None
@@ -1,6 +1,10 @@
+from typing import Literal, Union
+
 from pydantic import BaseModel
 
 
 class PaginationParamsSchema(BaseModel):
     page: int = 1
     page_size: int = 100
+    cursor: Union[str, None] = None
+    count: Literal["exact", "estimated", "none"] = "exact"
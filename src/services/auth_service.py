@@ -1,5 +1,7 @@
+import hashlib
+import hmac
 from datetime import datetime, timedelta, timezone
-from typing import Union
+from typing import Optional, Union
 
 import bcrypt
 import jwt
@@ -8,6 +10,7 @@ from loguru import logger
 from config import settings
 from cruds import user_crud
 from dependencies import GetDBDep
+from models import User
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -46,3 +49,24 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
+
+
+def create_calendar_token(user: User) -> str:
+    """Returns the token that grants read access to a walker's calendar feed.
+
+    Calendar apps can't send a bearer token, so the feed URL carries this one
+    instead. It changes (revoking the old URL) whenever the user's
+    `calendar_token_version` is bumped, or the SECRET_KEY changes.
+    """
+    message = f"calendar:{user.user_id}:{user.calendar_token_version}"
+    digest = hmac.new(
+        settings.SECRET_KEY.encode("utf-8"), message.encode("utf-8"), hashlib.sha256
+    )
+    return digest.hexdigest()
+
+
+def verify_calendar_token(user: Optional[User], token: str) -> bool:
+    """Checks a calendar token against the current one of an active user."""
+    if user is None or not user.is_active:
+        return False
+    return hmac.compare_digest(create_calendar_token(user), token)
@@ -0,0 +1,247 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import select
+
+from database import SessionLocal
+from exceptions import ConflictError
+from models import Booking, Service, User
+
+# Used for services without a duration
+DEFAULT_DURATION_MINUTES = 60
+
+MAXIMUM_AVAILABILITY_DAYS = 62
+
+
+def _to_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _get_duration_minutes(duration: Optional[float]) -> int:
+    return int(duration) if duration else DEFAULT_DURATION_MINUTES
+
+
+class BookingIntervalIndex:
+    """Walkers' busy intervals per day, kept sorted by start for bisection.
+
+    Intervals are (start, end, booking_id) in minutes since midnight.
+    """
+
+    def __init__(self):
+        self._intervals = defaultdict(list)
+        self._longest = 0
+
+    def add(
+        self,
+        user_id: int,
+        booking_date: date,
+        start: int,
+        end: int,
+        booking_id: Optional[int] = None,
+    ):
+        insort(self._intervals[(user_id, booking_date)], (start, end, booking_id))
+        self._longest = max(self._longest, end - start)
+
+    def get_overlapping(
+        self,
+        user_id: int,
+        booking_date: date,
+        start: int,
+        end: int,
+    ) -> list[tuple[int, int, Optional[int]]]:
+        intervals = self._intervals.get((user_id, booking_date), [])
+        # Nothing starting before `start - longest` can reach `start`
+        i = bisect_left(intervals, (start - self._longest,))
+        overlapping = []
+        for interval in intervals[i:]:
+            interval_start, interval_end, _ = interval
+            if interval_start >= end:
+                break
+            if interval_end > start:
+                overlapping.append(interval)
+        return overlapping
+
+    def is_free(self, user_id: int, booking_date: date, start: int, end: int) -> bool:
+        return not self.get_overlapping(user_id, booking_date, start, end)
+
+
+def get_booking_interval_index(
+    db: SessionLocal,
+    user_ids: Iterable[int],
+    date_min: date,
+    date_max: date,
+    exclude_booking_ids: Iterable[int] = (),
+) -> BookingIntervalIndex:
+    """Loads the walkers' bookings from `date_min` up to `date_max` (exclusive)."""
+    query = (
+        select(
+            Booking.booking_id,
+            Booking.user_id,
+            Booking.date,
+            Booking.time,
+            Service.duration,
+        )
+        .join(Service, Booking.service_id == Service.service_id)
+        .where(Booking.user_id.in_(set(user_ids)))
+        .where(Booking.date >= _to_date(date_min))
+        .where(Booking.date < _to_date(date_max))
+    )
+    if exclude_booking_ids := set(exclude_booking_ids):
+        query = query.where(Booking.booking_id.not_in(exclude_booking_ids))
+    index = BookingIntervalIndex()
+    for booking_id, user_id, booking_date, booking_time, duration in db.execute(query):
+        start = _to_minutes(booking_time)
+        end = start + _get_duration_minutes(duration)
+        index.add(user_id, booking_date, start, end, booking_id)
+    return index
+
+
+def get_service_durations(db: SessionLocal, service_ids: Iterable[int]) -> dict:
+    query = select(Service.service_id, Service.duration).where(
+        Service.service_id.in_(set(service_ids))
+    )
+    return {
+        service_id: _get_duration_minutes(duration)
+        for service_id, duration in db.execute(query)
+    }
+
+
+def lock_walkers(db: SessionLocal, user_ids: Iterable[int]):
+    """Locks the walkers' user rows until the session's transaction ends.
+
+    Concurrent transactions booking any of the same walkers wait here, so that a
+    conflict check and the write it guards can't interleave with another's. The
+    rows are locked in id order so that two batches can't deadlock. SQLite has no
+    row locks (and runs one write transaction at a time), so this is a no-op there.
+    """
+    query = (
+        select(User.user_id)
+        .where(User.user_id.in_(sorted(set(user_ids))))
+        .order_by(User.user_id)
+        .with_for_update()
+    )
+    db.execute(query).all()
+
+
+def check_booking_conflicts(db: SessionLocal, bookings: list[dict]):
+    """Raises a ConflictError if any booking overlaps another of its walker's.
+
+    Each booking is a dict with `date`, `time`, `service_id`, `user_id` and, when
+    it already exists, `booking_id`. Bookings are also checked against each other,
+    rather than against where the existing ones are being moved from.
+
+    The walkers are locked first (see `lock_walkers`), so the caller must write
+    the bookings in the same transaction, and commit or roll it back, afterwards.
+    """
+    booking_ids = [
+        booking["booking_id"]
+        for booking in bookings
+        if booking.get("booking_id") is not None
+    ]
+    bookings = [booking for booking in bookings if booking["user_id"] is not None]
+    if not bookings:
+        return
+    lock_walkers(db, [booking["user_id"] for booking in bookings])
+    dates = [_to_date(booking["date"]) for booking in bookings]
+    index = get_booking_interval_index(
+        db,
+        {booking["user_id"] for booking in bookings},
+        min(dates),
+        max(dates) + timedelta(days=1),
+        exclude_booking_ids=booking_ids,
+    )
+    durations = get_service_durations(
+        db, {booking["service_id"] for booking in bookings}
+    )
+    for booking, booking_date in zip(bookings, dates):
+        booking_id = booking.get("booking_id")
+        start = _to_minutes(booking["time"])
+        end = start + durations.get(booking["service_id"], DEFAULT_DURATION_MINUTES)
+        overlapping = index.get_overlapping(
+            booking["user_id"], booking_date, start, end
+        )
+        if overlapping:
+            overlapping_ids = [interval[2] for interval in overlapping if interval[2]]
+            detail = (
+                f"Walker {booking['user_id']} is already booked on {booking_date} "
+                f"at {booking['time']}"
+            )
+            if overlapping_ids:
+                detail = f"{detail} (bookings {overlapping_ids})"
+            logger.debug(detail)
+            raise ConflictError(detail)
+        index.add(booking["user_id"], booking_date, start, end, booking_id)
+
+
+def _get_free_days(
+    index: BookingIntervalIndex,
+    user_id: int,
+    date_min: date,
+    date_max: date,
+    time_choices: list[tuple[str, str]],
+    duration_minutes: int,
+):
+    starts = [_to_minutes(time.fromisoformat(value)) for value, _ in time_choices]
+    for days in range((date_max - date_min).days):
+        booking_date = date_min + timedelta(days=days)
+        yield booking_date, [
+            index.is_free(user_id, booking_date, start, start + duration_minutes)
+            for start in starts
+        ]
+
+
+def get_free_slots(
+    db: SessionLocal,
+    user_id: int,
+    date_min: date,
+    date_max: date,
+    time_choices: list[tuple[str, str]],
+    duration_minutes: int = DEFAULT_DURATION_MINUTES,
+) -> dict[date, list[tuple[str, str]]]:
+    """Returns the time choices on each day that a walker is free for a booking.
+
+    Covers the days from `date_min` up to, but not including, `date_max`.
+    """
+    date_min, date_max = _to_date(date_min), _to_date(date_max)
+    index = get_booking_interval_index(db, [user_id], date_min, date_max)
+    free_days = _get_free_days(
+        index, user_id, date_min, date_max, time_choices, duration_minutes
+    )
+    return {
+        booking_date: [
+            time_choice
+            for time_choice, is_free in zip(time_choices, free_flags)
+            if is_free
+        ]
+        for booking_date, free_flags in free_days
+    }
+
+
+def get_availability_bitmaps(
+    db: SessionLocal,
+    user_id: int,
+    date_min: date,
+    date_max: date,
+    time_choices: list[tuple[str, str]],
+    duration_minutes: int,
+) -> dict[date, str]:
+    """Returns a string per day with a "1" for each free time choice, else "0".
+
+    Covers the days from `date_min` up to, but not including, `date_max`.
+    """
+    date_min, date_max = _to_date(date_min), _to_date(date_max)
+    index = get_booking_interval_index(db, [user_id], date_min, date_max)
+    free_days = _get_free_days(
+        index, user_id, date_min, date_max, time_choices, duration_minutes
+    )
+    return {
+        booking_date: "".join("1" if is_free else "0" for is_free in free_flags)
+        for booking_date, free_flags in free_days
+    }
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from models import Booking
+
+# Used for services without a duration
+DEFAULT_DURATION_MINUTES = 60
+
+# Octets per content line before it must be folded (RFC 5545, section 3.1)
+MAXIMUM_LINE_LENGTH = 75
+
+
+def _escape_text(value: Optional[str]) -> str:
+    value = value or ""
+    for character, escaped in (("\\", "\\\\"), (";", "\\;"), (",", "\\,")):
+        value = value.replace(character, escaped)
+    return value.replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _fold_line(line: str) -> str:
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAXIMUM_LINE_LENGTH:
+        return line + "\r\n"
+    lines = []
+    start = 0
+    limit = MAXIMUM_LINE_LENGTH
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never split a multi-byte character across lines
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        lines.append(encoded[start:end].decode("utf-8"))
+        start = end
+        # Continuation lines start with a space, which counts towards the limit
+        limit = MAXIMUM_LINE_LENGTH - 1
+    return "\r\n ".join(lines) + "\r\n"
+
+
+def _format_date_time(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _format_utc_date_time(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def format_calendar_header(name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//W4lkies//Bookings//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(name)}",
+    ]
+    return "".join(_fold_line(line) for line in lines)
+
+
+def format_calendar_footer() -> str:
+    return _fold_line("END:VCALENDAR")
+
+
+def format_booking_event(booking: Booking) -> str:
+    start = datetime.combine(booking.date, booking.time)
+    duration = booking.service.duration or DEFAULT_DURATION_MINUTES
+    end = start + timedelta(minutes=duration)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:booking-{booking.booking_id}@w4lkies",
+        f"DTSTAMP:{_format_utc_date_time(booking.updated_at)}",
+        f"LAST-MODIFIED:{_format_utc_date_time(booking.updated_at)}",
+        f"DTSTART:{_format_date_time(start)}",
+        f"DTEND:{_format_date_time(end)}",
+        f"SUMMARY:{_escape_text(f'{booking.service.name} - {booking.customer.name}')}",
+        f"DESCRIPTION:{_escape_text(booking.customer.phone)}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold_line(line) for line in lines)
+
+
+def stream_calendar(name: str, bookings: Iterable[Booking]) -> Iterator[str]:
+    """Yields an iCalendar document one VEVENT at a time."""
+    yield format_calendar_header(name)
+    for booking in bookings:
+        yield format_booking_event(booking)
+    yield format_calendar_footer()
@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
+
+# Rows written per chunk of the response body
+CHUNK_SIZE = 500
+
+
+def _get_chunks(rows: Iterable[Sequence], chunk_size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def stream_csv(
+    header: Sequence[str], rows: Iterable[Sequence], chunk_size: int = CHUNK_SIZE
+) -> Iterator[str]:
+    """Yields a CSV document a chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    for chunk in _get_chunks(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(
+    header: Sequence[str], rows: Iterable[Sequence], chunk_size: int = CHUNK_SIZE
+) -> Iterator[str]:
+    """Yields one JSON object per row and line, a chunk of rows at a time."""
+    for chunk in _get_chunks(rows, chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(header, row)), default=str) + "\n" for row in chunk
+        )
@@ -1,11 +1,11 @@
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
 import sys
 import tempfile
 from typing import Dict
 
 from loguru import logger
-from PIL import Image
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 from reportlab.lib.pagesizes import letter
@@ -16,6 +16,8 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Table, TableStyle
 
+from services.invoice_pdf_cache_service import get_invoice_filename
+
 x_0 = 0.5 * inch
 y_0 = 8.25 * inch
 
@@ -41,47 +43,189 @@ theme_color_3 = "#8bb4a6"
 theme_font_1 = ""
 
 
-def _add_header(pdf, invoice, width, height):
+# Names of the form XObjects that hold the parts every invoice shares
+HEADER_FORM = "InvoiceHeader"
+PAYMENT_DETAILS_FORM = "InvoicePaymentDetails"
+
+logo_width = 150
+logo_aspect_ratio = 1.1
+logo_height = logo_aspect_ratio * logo_width
+
+TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), theme_color_1),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), theme_color_2),
+        ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+        ("ALIGN", (0, 1), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 1), (-1, -1), 11),
+        ("RIGHTPADDING", (2, 1), (2, -1), 5),
+        ("RIGHTPADDING", (3, 1), (3, -1), 5),
+        ("RIGHTPADDING", (4, 1), (4, -1), 5),
+    ]
+)
+
+
+@lru_cache(maxsize=None)
+def _get_logo_bytes() -> bytes:
+    # Read once per process instead of on every invoice
+    with open(server_logo, "rb") as logo_file:
+        return logo_file.read()
+
+
+def _get_logo() -> ImageReader:
+    # ImageReader isn't thread-safe and invoices render on several threads, so
+    # each render gets its own
+    return ImageReader(BytesIO(_get_logo_bytes()))
+
+
+def _get_header_positions(height) -> dict:
+    x = x_0 + 4.25 * inch
+    y_ids = 0.9 * height - medium_skip
+    y_help = y_ids - 2 * small_skip - medium_skip
+    return {
+        "x_ids": x,
+        "y_ids": y_ids,
+        "y_help": y_help,
+        "x_email": x + pdfmetrics.stringWidth("Need help? ", "Helvetica", 12),
+        # Where the page's content starts below the header
+        "x_content": x_0 + medium_skip,
+        "y_content": y_help - big_skip,
+    }
+
+
+def _draw_header_form(pdf, width, height):
+    positions = _get_header_positions(height)
+
     # Invoice logo
-    logo_width = 150
-    logo_aspect_ratio = 1.1
-    logo_height = logo_aspect_ratio * logo_width
-    # w, h = pdf.drawInlineImage(
-    #     server_logo,
-    #     x_0,
-    #     y_0,
-    #     width=logo_width,
-    #     height=logo_height,
-    # )
-
-    from reportlab.lib.utils import ImageReader
-
-    image_path = "src/static/images/logo.png"
-    img = ImageReader(image_path)
-    w, h = pdf.drawImage(
-        img, x_0, y_0, width=logo_width, height=logo_height, mask="auto"
+    pdf.drawImage(
+        _get_logo(), x_0, y_0, width=logo_width, height=logo_height, mask="auto"
+    )
+
+    # Invoice title
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.setFillColor(colors.black)
+    pdf.drawCentredString(width / 2, 0.9 * height, "Invoice".upper())
+
+    # Email contact for invoice help
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(positions["x_ids"], positions["y_help"], "Need help? ")
+    pdf.drawString(positions["x_email"], positions["y_help"], server_email)
+
+
+def _draw_payment_details_form(pdf, x, y, width):
+    # Payment Details
+    x_payment = x
+    y_payment = y
+    # Bank payment details
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(x, y, "Bank Details:")
+    pdf.setFont("Helvetica", 12)
+    y -= small_skip
+    y -= 0.125 * inch
+    pdf.drawString(x, y, "Account Name: " + "London W4lkies Ltd")
+    y -= small_skip
+    pdf.drawString(x, y, "Sort Code: " + server_bank_sort_code)
+    y -= small_skip
+    text = "Account Number: " + str(server_bank_account_number)
+    pdf.drawString(x, y, text)
+
+    y -= small_skip
+    text = "Bank Name: Revolut"
+    pdf.drawString(x, y, text)
+
+    x = x_payment + 3 * inch
+    y = y_payment
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(x, y, "Other Payment Methods:")
+
+    y -= small_skip
+    y -= 0.125 * inch
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 12)
+    # pdf.drawString(x, y, "Want to pay by PayPal? (debit/credit)")
+    # pdf.setFont("Helvetica", 12)
+    # y -= small_skip
+    # pdf.drawString(x, y, "Request a PayPal invoice.")
+    # y -= small_skip
+    # pdf.drawString(x, y, "Note a 7% fee will be added to the total.")
+
+    # y -= medium_skip
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(x, y, "Want to pay by Bitcoin?")
+    pdf.setFont("Helvetica", 12)
+    y -= small_skip
+    pdf.drawString(x, y, "Request a Bitcoin Lightning invoice.")
+    y -= small_skip
+    pdf.drawString(x, y, "Or send Bitcoin to pay@w4lkies.com")
+
+    y -= medium_skip
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(x, y, "Want to pay by Cash?")
+    pdf.setFont("Helvetica", 12)
+    pdf.setFont("Helvetica", 12)
+    y -= small_skip
+    pdf.drawString(x, y, "Pay in Person")
+
+    #  Footer
+    x = width / 2.0
+
+    # TODO (ajrl) small_skip and big_skip, y += small_skip
+    y -= big_skip
+    y -= big_skip
+
+    text = "Thank you for your business!".upper()
+    pdf.setFillColor(colors.black)
+    # pdf.setFont("theme_font_1", 12)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawCentredString(x, y, text)
+
+
+def _add_forms(pdf, width, height):
+    """Draws the static parts of an invoice once into form XObjects.
+
+    Each page then references a form instead of repeating its drawing operations
+    (and the PDF stores them once). Forms belong to a document, so they are drawn
+    again for each invoice.
+    """
+    pdf.beginForm(HEADER_FORM)
+    _draw_header_form(pdf, width, height)
+    pdf.endForm()
+
+    positions = _get_header_positions(height)
+    pdf.beginForm(PAYMENT_DETAILS_FORM)
+    _draw_payment_details_form(
+        pdf, positions["x_content"], positions["y_content"], width
     )
+    pdf.endForm()
+
 
+def _add_header(pdf, invoice, width, height):
+    positions = _get_header_positions(height)
+    pdf.doForm(HEADER_FORM)
+
+    # Links are annotations of the page, so they can't be part of the form
     pdf.linkURL(
         server_url,
-        (x_0, y_0, x_0 + w, y_0 + h),
+        (x_0, y_0, x_0 + logo_width, y_0 + logo_height),
         thickness=0,
         relative=1,
     )
 
-    # Invoice title
-    pdf.setFont("Helvetica-Bold", 20)
-    pdf.setFillColor(colors.black)
-    x = width / 2
-    y = 0.9 * height
-    text = "Invoice"
-    pdf.drawCentredString(x, y, text.upper())
-
     # Invoice IDs
     pdf.setFont("Helvetica", 12)
     pdf.setFillColor(colors.black)
-    x = x_0 + 4.25 * inch
-    y -= medium_skip
+    x = positions["x_ids"]
+    y = positions["y_ids"]
     pdf.drawString(x, y, f"Reference: #{invoice.reference}")
     y -= small_skip
     pdf.drawString(x, y, f"Issued Date: {invoice.date_issued}")
@@ -90,14 +234,9 @@ def _add_header(pdf, invoice, width, height):
     pdf.drawString(x, y, text)
 
     # Email contact for invoice help
-    y -= medium_skip
-    text = "Need help? "
-    pdf.drawString(x, y, text)
-    w = pdf.stringWidth(text)
-    x += w
-    text = server_email
-    pdf.drawString(x, y, text)
-    w = pdf.stringWidth(text)
+    x = positions["x_email"]
+    y = positions["y_help"]
+    w = pdf.stringWidth(server_email)
     h = pdf._leading
     text = f"mailto:{server_email}?subject=Invoice #{invoice.reference}"
     pdf.linkURL(
@@ -106,9 +245,7 @@ def _add_header(pdf, invoice, width, height):
         thickness=0,
         relative=1,
     )
-    x = x_0 + medium_skip
-    y -= big_skip
-    return x, y
+    return positions["x_content"], positions["y_content"]
 
 
 def _add_page_break(pdf, invoice, width, height):
@@ -122,6 +259,7 @@ def _create(invoice):
     buffer = BytesIO()
     pdf = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
+    _add_forms(pdf, width, height)
 
     # Invoice header
     x, y = _add_header(pdf, invoice, width, height)
@@ -137,24 +275,6 @@ def _create(invoice):
     number_of_chunks = len(booking_chunks)
     for i, bookings in enumerate(booking_chunks):
         table_header = ["Date", "Service", f"Price / {currency}"]
-        table_style = TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), theme_color_1),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 12),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), theme_color_2),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("ALIGN", (0, 1), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 1), (-1, -1), 11),
-                ("RIGHTPADDING", (2, 1), (2, -1), 5),
-                ("RIGHTPADDING", (3, 1), (3, -1), 5),
-                ("RIGHTPADDING", (4, 1), (4, -1), 5),
-            ]
-        )
         table_data = [table_header]
         for booking in bookings:
             booking_date = booking.date
@@ -167,7 +287,7 @@ def _create(invoice):
                 ]
             )
         table = Table(table_data, colWidths=[2.16 * inch, 2.16 * inch, 2.16 * inch])
-        table.setStyle(table_style)
+        table.setStyle(TABLE_STYLE)
         w, h = table.wrapOn(pdf, 400, 400)
         x = (width - w) / 2
         if i == 0:
@@ -205,75 +325,8 @@ def _create(invoice):
         # Page break
         x, y = _add_page_break(pdf, invoice, width, height)
 
-    # Payment Details
-    x_payment = x
-    y_payment = y
-    # Bank payment details
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(x, y, "Bank Details:")
-    pdf.setFont("Helvetica", 12)
-    y -= small_skip
-    y -= 0.125 * inch
-    pdf.drawString(x, y, "Account Name: " + "London W4lkies Ltd")
-    y -= small_skip
-    pdf.drawString(x, y, "Sort Code: " + server_bank_sort_code)
-    y -= small_skip
-    text = "Account Number: " + str(server_bank_account_number)
-    pdf.drawString(x, y, text)
-
-    y -= small_skip
-    text = "Bank Name: Revolut"
-    pdf.drawString(x, y, text)
-
-    x = x_payment + 3 * inch
-    y = y_payment
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(x, y, "Other Payment Methods:")
-
-    y -= small_skip
-    y -= 0.125 * inch
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 12)
-    # pdf.drawString(x, y, "Want to pay by PayPal? (debit/credit)")
-    # pdf.setFont("Helvetica", 12)
-    # y -= small_skip
-    # pdf.drawString(x, y, "Request a PayPal invoice.")
-    # y -= small_skip
-    # pdf.drawString(x, y, "Note a 7% fee will be added to the total.")
-
-    # y -= medium_skip
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(x, y, "Want to pay by Bitcoin?")
-    pdf.setFont("Helvetica", 12)
-    y -= small_skip
-    pdf.drawString(x, y, "Request a Bitcoin Lightning invoice.")
-    y -= small_skip
-    pdf.drawString(x, y, "Or send Bitcoin to pay@w4lkies.com")
-
-    y -= medium_skip
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(x, y, "Want to pay by Cash?")
-    pdf.setFont("Helvetica", 12)
-    pdf.setFont("Helvetica", 12)
-    y -= small_skip
-    pdf.drawString(x, y, "Pay in Person")
-
-    #  Footer
-    x = width / 2.0
-
-    # TODO (ajrl) small_skip and big_skip, y += small_skip
-    y -= big_skip
-    y -= big_skip
-
-    text = "Thank you for your business!".upper()
-    pdf.setFillColor(colors.black)
-    # pdf.setFont("theme_font_1", 12)
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawCentredString(x, y, text)
+    # Payment details and footer
+    pdf.doForm(PAYMENT_DETAILS_FORM)
 
     # Save and create PDF file and filename
     pdf.save()
@@ -282,10 +335,7 @@ def _create(invoice):
     pdf_file = BytesIO()
     pdf_file.write(pdf_bytes)
     pdf_file.seek(0)
-    customer_name = invoice.customer.name
-    year_issued = invoice.date_issued.strftime("%Y")
-    month_issued = invoice.date_issued.strftime("%B")
-    pdf_filepath = f"{customer_name} {year_issued} {month_issued}.pdf"
+    pdf_filepath = get_invoice_filename(invoice)
 
     return pdf_file, pdf_filepath
 
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Optional
+
+from loguru import logger
+
+from config import settings
+from models import Invoice
+
+# Bump whenever the PDF layout changes, so that stale renders are not served
+RENDER_VERSION = 1
+
+# Most recently used PDFs by render key
+_pdfs: OrderedDict[str, bytes] = OrderedDict()
+_pdfs_lock = threading.Lock()
+
+
+def get_invoice_filename(invoice) -> str:
+    customer_name = invoice.customer.name
+    year_issued = invoice.date_issued.strftime("%Y")
+    month_issued = invoice.date_issued.strftime("%B")
+    return f"{customer_name} {year_issued} {month_issued}.pdf"
+
+
+def _to_json(value):
+    return vars(value) if isinstance(value, SimpleNamespace) else str(value)
+
+
+def get_render_inputs(invoice: Invoice) -> SimpleNamespace:
+    """Copies everything the PDF is rendered from out of an invoice.
+
+    The copy has the same attributes the renderer reads from the invoice, plus
+    `key`, a hash of them that identifies the rendered PDF, and `filename`.
+    """
+    bookings = sorted(
+        invoice.bookings,
+        key=lambda booking: (booking.date, booking.time, booking.booking_id),
+    )
+    render_inputs = SimpleNamespace(
+        reference=invoice.reference,
+        date_issued=invoice.date_issued,
+        date_due=invoice.date_due,
+        price_subtotal=invoice.price_subtotal,
+        price_discount=invoice.price_discount,
+        price_total=invoice.price_total,
+        customer=SimpleNamespace(name=invoice.customer.name),
+        bookings=[
+            SimpleNamespace(
+                date=booking.date,
+                time=booking.time,
+                service=SimpleNamespace(
+                    name=booking.service.name, price=booking.service.price
+                ),
+            )
+            for booking in bookings
+        ],
+    )
+    payload = json.dumps(
+        [RENDER_VERSION, render_inputs], default=_to_json, sort_keys=True
+    )
+    render_inputs.key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    render_inputs.filename = get_invoice_filename(render_inputs)
+    return render_inputs
+
+
+def _get_path(key: str) -> str:
+    return os.path.join(settings.INVOICE_PDF_CACHE_DIR, f"{key}.pdf")
+
+
+def _remember(key: str, pdf_bytes: bytes):
+    with _pdfs_lock:
+        _pdfs[key] = pdf_bytes
+        _pdfs.move_to_end(key)
+        while len(_pdfs) > settings.INVOICE_PDF_CACHE_SIZE:
+            _pdfs.popitem(last=False)
+
+
+def get_cached_pdf(key: str) -> Optional[bytes]:
+    """Returns a rendered PDF from memory, else from disk, or None."""
+    with _pdfs_lock:
+        if key in _pdfs:
+            _pdfs.move_to_end(key)
+            return _pdfs[key]
+    try:
+        with open(_get_path(key), "rb") as f:
+            pdf_bytes = f.read()
+    except OSError:
+        return None
+    _remember(key, pdf_bytes)
+    return pdf_bytes
+
+
+def set_cached_pdf(key: str, pdf_bytes: bytes):
+    _remember(key, pdf_bytes)
+    try:
+        os.makedirs(settings.INVOICE_PDF_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial PDF
+        with tempfile.NamedTemporaryFile(
+            dir=settings.INVOICE_PDF_CACHE_DIR, suffix=".tmp", delete=False
+        ) as f:
+            f.write(pdf_bytes)
+        os.replace(f.name, _get_path(key))
+    except OSError as e:
+        # The in-memory copy still serves this process
+        logger.warning(f"Unable to cache invoice PDF {key} on disk: {e}")
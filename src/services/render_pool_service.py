@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from config import settings
+from exceptions import ServiceUnavailableError
+
+_executor = None
+_lock = threading.Lock()
+_metrics = {
+    "pending": 0,
+    "running": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INVOICE_RENDER_WORKERS,
+                thread_name_prefix="invoice-render",
+            )
+        return _executor
+
+
+def _run(function: Callable, *args):
+    with _lock:
+        _metrics["running"] += 1
+    try:
+        return function(*args)
+    finally:
+        with _lock:
+            _metrics["running"] -= 1
+
+
+def _on_done(future: Future) -> None:
+    with _lock:
+        _metrics["pending"] -= 1
+        if future.cancelled() or future.exception() is not None:
+            _metrics["failed"] += 1
+        else:
+            _metrics["completed"] += 1
+
+
+async def run(function: Callable, *args):
+    """Runs a CPU-bound function on the render threads without blocking the loop.
+
+    At most `INVOICE_RENDER_MAX_PENDING` calls may be running or queued at once.
+    Beyond that a ServiceUnavailableError is raised straight away rather than
+    letting requests pile up behind the workers.
+    """
+    with _lock:
+        if _metrics["pending"] >= settings.INVOICE_RENDER_MAX_PENDING:
+            _metrics["rejected"] += 1
+            raise ServiceUnavailableError(
+                "Too many invoices are being rendered, please try again shortly."
+            )
+        _metrics["pending"] += 1
+    future = _get_executor().submit(_run, function, *args)
+    # A cancelled request (e.g. the client disconnecting) stops awaiting but not
+    # the render itself, so the slot is only released once the thread finishes
+    future.add_done_callback(_on_done)
+    return await asyncio.wrap_future(future)
+
+
+def get_metrics() -> dict:
+    """Returns the render pool's size, load and counters."""
+    with _lock:
+        metrics = dict(_metrics)
+    metrics["workers"] = settings.INVOICE_RENDER_WORKERS
+    metrics["max_pending"] = settings.INVOICE_RENDER_MAX_PENDING
+    # Renders waiting for a free worker
+    metrics["queue_depth"] = metrics["pending"] - metrics["running"]
+    return metrics
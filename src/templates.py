@@ -1,8 +1,14 @@
-from fastapi.templating import Jinja2Templates
+from functools import lru_cache
 
-templates = Jinja2Templates(directory="src/templates")
+
+@lru_cache(maxsize=None)
+def get_templates():
+    # Imported here as Jinja2 is only needed when an email is rendered
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="src/templates")
 
 
 def render_template(template: str, kwargs: dict) -> str:
-    content = templates.TemplateResponse(template, kwargs).body.decode("utf-8")
+    content = get_templates().TemplateResponse(template, kwargs).body.decode("utf-8")
     return content
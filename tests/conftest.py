@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+from datetime import date, time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# Always run against a scratch SQLite database, never the one in the environment
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "test.db"
+)
+os.environ.pop("SQLALCHEMY_REPLICA_URI", None)
+os.environ.setdefault("PROJECT_NAME", "W4lkies API")
+os.environ.setdefault("PROJECT_VERSION", "0.0.0")
+os.environ.setdefault("SECRET_KEY", "a-secret-key-for-the-tests-only-32-bytes")
+os.environ.setdefault("ALLOW_ORIGINS", "http://127.0.0.1:8080")
+# The static directory is mounted relative to the repository root
+os.chdir(ROOT)
+
+import bcrypt
+from fastapi.testclient import TestClient
+
+from database import Base, get_engine, get_session
+from main import app
+from models import Booking, Customer, Service, User
+from pagination import invalidate_count_cache
+
+PASSWORD = "password"
+
+
+@pytest.fixture
+def db():
+    engine = get_engine()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    invalidate_count_cache(*Base.metadata.tables)
+    session = get_session()
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    audit = {"created_by": 1, "updated_by": 1}
+    session.add_all(
+        [
+            User(
+                user_id=1,
+                name="Active Admin",
+                password_hash=password_hash,
+                is_admin=True,
+                is_active=True,
+                **audit,
+            ),
+            User(
+                user_id=2,
+                name="Active User",
+                password_hash=password_hash,
+                is_admin=False,
+                is_active=True,
+                **audit,
+            ),
+            Customer(customer_id=1, name="Customer", is_active=True, **audit),
+            Service(
+                service_id=1,
+                name="Walk",
+                price=15.0,
+                description="",
+                duration=60,
+                **audit,
+            ),
+        ]
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+def get_auth_headers(client, name: str) -> dict:
+    response = client.post("/auth/token", data={"username": name, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin_headers(client):
+    return get_auth_headers(client, "Active Admin")
+
+
+def add_booking(
+    db,
+    booking_date: date,
+    booking_time: time,
+    user_id: int = 2,
+    customer_id: int = 1,
+    service_id: int = 1,
+):
+    booking = Booking(
+        date=booking_date,
+        time=booking_time,
+        customer_id=customer_id,
+        service_id=service_id,
+        user_id=user_id,
+        created_by=1,
+        updated_by=1,
+    )
+    db.add(booking)
+    db.commit()
+    return booking
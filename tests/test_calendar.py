@@ -0,0 +1,60 @@
+from datetime import date, time
+from urllib.parse import urlsplit
+
+from conftest import add_booking, get_auth_headers
+from models import User
+
+
+def get_feed_url(client, headers, user_id=2, method="get"):
+    response = client.request(
+        method, f"/bookings/calendar/{user_id}/url", headers=headers
+    )
+    assert response.status_code == 200, response.text
+    url = urlsplit(response.json()["url"])
+    return f"{url.path}?{url.query}"
+
+
+def test_feed_accepts_its_token(client, admin_headers):
+    feed_url = get_feed_url(client, admin_headers)
+    response = client.get(feed_url)
+    assert response.status_code == 200
+    assert response.text.startswith("BEGIN:VCALENDAR")
+
+
+def test_feed_rejects_other_walkers_token(client, admin_headers):
+    feed_url = get_feed_url(client, admin_headers, user_id=1)
+    response = client.get(feed_url.replace("/calendar/1.ics", "/calendar/2.ics"))
+    assert response.status_code == 401
+
+
+def test_rotating_revokes_the_old_url(client):
+    headers = get_auth_headers(client, "Active User")
+    old_url = get_feed_url(client, headers)
+    new_url = get_feed_url(client, headers, method="post")
+    assert new_url != old_url
+    assert client.get(old_url).status_code == 401
+    assert client.get(new_url).status_code == 200
+    assert get_feed_url(client, headers) == new_url
+
+
+def test_feed_rejects_inactive_walkers(client, db, admin_headers):
+    feed_url = get_feed_url(client, admin_headers)
+    db.get(User, 2).is_active = False
+    db.commit()
+    assert client.get(feed_url).status_code == 401
+
+
+def test_deleting_a_booking_changes_the_feed(client, db, admin_headers):
+    booking_id = add_booking(db, date.today(), time(9, 0)).booking_id
+    add_booking(db, date.today(), time(12, 0))
+    feed_url = get_feed_url(client, admin_headers)
+    response = client.get(feed_url)
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    assert client.get(feed_url, headers={"If-None-Match": etag}).status_code == 304
+
+    response = client.delete(f"/bookings/{booking_id}", headers=admin_headers)
+    assert response.status_code == 200
+    for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+        response = client.get(feed_url, headers=headers)
+        assert response.status_code == 200
+        assert response.text.count("BEGIN:VEVENT") == 1
@@ -0,0 +1,20 @@
+import pytest
+
+from config import settings
+
+ORIGIN = settings.ALLOW_ORIGINS.split(",")[0]
+
+
+@pytest.mark.parametrize("method", ["GET", "POST", "PUT", "PATCH", "DELETE"])
+def test_preflight_allows_method(client, method):
+    response = client.options(
+        "/bookings/bulk",
+        headers={
+            "Origin": ORIGIN,
+            "Access-Control-Request-Method": method,
+            "Access-Control-Request-Headers": "Authorization, Content-Type",
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN
+    assert method in response.headers["Access-Control-Allow-Methods"]
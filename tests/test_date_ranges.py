@@ -0,0 +1,95 @@
+"""The booking `date_min`/`date_max` filters are half-open: date_min <= date < date_max.
+
+The invoice list predates them and keeps its inclusive `date_max`.
+"""
+
+from datetime import date, time
+
+from conftest import add_booking
+from models import Invoice
+
+DAY = date(2030, 1, 7)
+NEXT_DAY = date(2030, 1, 8)
+
+
+def test_free_slots_exclude_date_max(client, admin_headers):
+    response = client.get(
+        "/bookings/free_slots",
+        params={"user_id": 2, "date_min": DAY, "date_max": NEXT_DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert list(response.json()) == [DAY.isoformat()]
+
+
+def test_free_slots_reject_empty_range(client, admin_headers):
+    response = client.get(
+        "/bookings/free_slots",
+        params={"user_id": 2, "date_min": DAY, "date_max": DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
+
+
+def test_availability_excludes_date_max(client, db, admin_headers):
+    add_booking(db, NEXT_DAY, time(9, 0))
+    response = client.get(
+        "/bookings/availability",
+        params={"user_id": 2, "date_min": DAY, "date_max": NEXT_DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    days = response.json()["days"]
+    assert list(days) == [DAY.isoformat()]
+    assert "0" not in days[DAY.isoformat()]
+
+
+def test_stats_exclude_date_max(client, db, admin_headers):
+    add_booking(db, DAY, time(9, 0))
+    add_booking(db, NEXT_DAY, time(9, 0))
+    response = client.get(
+        "/bookings/stats",
+        params={"date_min": DAY, "date_max": NEXT_DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+
+
+def test_export_excludes_date_max(client, db, admin_headers):
+    add_booking(db, DAY, time(9, 0))
+    add_booking(db, NEXT_DAY, time(9, 0))
+    response = client.get(
+        "/bookings/export",
+        params={"format": "ndjson", "date_min": DAY, "date_max": NEXT_DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 1
+
+
+def test_invoices_include_date_max(client, db, admin_headers):
+    for invoice_id, date_issued in ((1, DAY), (2, NEXT_DAY)):
+        db.add(
+            Invoice(
+                invoice_id=invoice_id,
+                customer_id=1,
+                date_start=date_issued,
+                date_end=date_issued,
+                date_issued=date_issued,
+                price_subtotal=0.0,
+                price_discount=0.0,
+                price_total=0.0,
+                reference=f"W4LKIES-{invoice_id}",
+                created_by=1,
+                updated_by=1,
+            )
+        )
+    db.commit()
+    response = client.get(
+        "/invoices/",
+        params={"date_min": DAY, "date_max": NEXT_DAY},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert [invoice["invoice_id"] for invoice in response.json()] == [2, 1]
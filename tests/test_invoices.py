@@ -0,0 +1,99 @@
+from datetime import date, time
+
+from sqlalchemy import select, update
+
+from conftest import add_booking
+from cruds import invoice_crud
+from database import get_session
+from models import Booking, Customer, Invoice, Service
+
+BATCH = {"date_start": "2030-01-01T00:00:00", "date_end": "2030-02-01T00:00:00"}
+
+
+def test_generate_batch_rejects_inverted_range(client, admin_headers):
+    data = {"date_start": BATCH["date_end"], "date_end": BATCH["date_start"]}
+    response = client.post("/invoices/generate_batch", json=data, headers=admin_headers)
+    assert response.status_code == 422
+
+
+def test_generate_batch_links_each_booking_once(client, db, admin_headers):
+    for day in (2, 3, 31):
+        add_booking(db, date(2030, 1, day), time(9, 0))
+    add_booking(db, date(2030, 2, 1), time(9, 0))
+
+    response = client.post(
+        "/invoices/generate_batch", json=BATCH, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    (invoice,) = response.json()
+    assert invoice["booking_count"] == 3
+    db.expire_all()
+    linked = db.query(Booking).filter(Booking.invoice_id == invoice["invoice_id"])
+    assert linked.count() == 3
+
+    # The bookings are already invoiced, so a second run has nothing to do
+    response = client.post(
+        "/invoices/generate_batch", json=BATCH, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+    assert db.query(Invoice).count() == 1
+
+
+def test_generate_batch_conflicts_if_bookings_are_invoiced_meanwhile(
+    client, db, admin_headers, monkeypatch
+):
+    booking_id = add_booking(db, date(2030, 1, 2), time(9, 0)).booking_id
+    add_booking(db, date(2030, 1, 3), time(9, 0))
+    get_invoice_reference = invoice_crud.get_invoice_reference
+
+    def invoice_a_booking_meanwhile(*args):
+        # Stands in for a concurrent run (on SQLite, which has no row locks)
+        with get_session() as other_db:
+            other_db.execute(
+                update(Booking)
+                .where(Booking.booking_id == booking_id)
+                .values(invoice_id=999)
+            )
+            other_db.commit()
+        return get_invoice_reference(*args)
+
+    monkeypatch.setattr(
+        invoice_crud, "get_invoice_reference", invoice_a_booking_meanwhile
+    )
+    response = client.post(
+        "/invoices/generate_batch", json=BATCH, headers=admin_headers
+    )
+    assert response.status_code == 409
+    assert db.query(Invoice).count() == 0
+
+
+def test_generate_invoice_totals_and_links_customer_bookings(client, db, admin_headers):
+    audit = {"created_by": 1, "updated_by": 1}
+    db.add(Customer(customer_id=2, name="Other customer", is_active=True, **audit))
+    db.add(Service(service_id=2, name="Drop in", price=7.5, description="", **audit))
+    db.commit()
+    booking_ids = [
+        add_booking(db, date(2030, 1, 2), time(9, 0)).booking_id,
+        add_booking(db, date(2030, 1, 3), time(9, 0)).booking_id,
+        add_booking(db, date(2030, 1, 4), time(9, 0), service_id=2).booking_id,
+    ]
+    # Outside the range, and another customer's
+    add_booking(db, date(2030, 2, 1), time(9, 0))
+    add_booking(db, date(2030, 1, 5), time(9, 0), customer_id=2)
+
+    response = client.post(
+        "/invoices/generate", json={**BATCH, "customer_id": 1}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    invoice = response.json()
+    assert invoice["price_subtotal"] == 15.0 * 2 + 7.5
+    assert invoice["price_discount"] == 0.0
+    assert invoice["price_total"] == 37.5
+    db.expire_all()
+    invoice_row = db.get(Invoice, invoice["invoice_id"])
+    assert invoice_row.created_by == invoice_row.updated_by == 1
+    linked = db.scalars(
+        select(Booking.booking_id).where(Booking.invoice_id == invoice["invoice_id"])
+    )
+    assert sorted(linked) == sorted(booking_ids)